@@ -0,0 +1,76 @@
+'''
+Benchmark passing a bot through a large network with the
+stack based traversal against recursing through the network
+
+PYTHONPATH=. python benchmarks/bot_bench.py
+'''
+import sys
+import timeit
+
+import octako.core as tako
+from octako import bot
+from octako import flow
+
+
+class Counter(tako.Noop):
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def incr(self):
+        self.count += 1
+
+    def spawn(self):
+        return Counter()
+
+
+def recursive_bot_forward(neuron, bot):
+    '''
+    The recursive traversal the network used before
+    bots were passed through with octako.bot.traverse
+    '''
+    bot(neuron)
+    if isinstance(neuron, tako.Arm):
+        recursive_bot_forward(neuron.strand.lhs, bot)
+    elif isinstance(neuron, flow.Flow):
+        for head in neuron.bot_heads():
+            recursive_bot_forward(head, bot)
+    if neuron.outgoing is not None:
+        recursive_bot_forward(neuron.outgoing, bot)
+
+
+def build(n_neurons, width=10):
+    '''
+    Build a strand of Multi flows that each contain
+    width strands of width neurons
+    '''
+    multis = []
+    for _ in range(n_neurons // (width * width)):
+        multis.append(flow.Multi([
+            tako.Strand([Counter() for _ in range(width)])
+            for _ in range(width)
+        ]))
+    return tako.Strand(multis)
+
+
+def main(n_neurons=100000, number=5):
+    strand = build(n_neurons)
+    stack = timeit.timeit(
+        lambda: strand.bot_forward(bot.call.incr()), number=number
+    )
+    print('stack based:  {:.4f}s per pass'.format(stack / number))
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * n_neurons))
+    try:
+        recursive = timeit.timeit(
+            lambda: recursive_bot_forward(strand.lhs, bot.call.incr()),
+            number=number
+        )
+        print('recursive:    {:.4f}s per pass'.format(recursive / number))
+    except RecursionError:
+        print('recursive:    RecursionError')
+
+
+if __name__ == '__main__':
+    main()
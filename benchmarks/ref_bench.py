@@ -0,0 +1,63 @@
+'''
+Benchmark evaluating references with compiled paths
+against walking the path
+
+PYTHONPATH=. python benchmarks/ref_bench.py
+'''
+import timeit
+
+from octako import ref
+
+
+def walk(path, val, x):
+    '''
+    Evaluate the path by walking it (how references were
+    evaluated before the paths were compiled)
+    '''
+    prev_prev_val = None
+    prev_val = val
+    for p in path:
+        if type(p) == ref.InCall:
+            val = p([prev_val, x, prev_prev_val])
+        else:
+            val = p.get(prev_val)
+        prev_prev_val = prev_val
+        prev_val = val
+    return val
+
+
+class Leaf(object):
+    value = [0, 1, 2]
+
+    def f(self, x):
+        return x
+
+
+class Inner(object):
+    leaf = Leaf()
+
+
+class Root(object):
+    inner = Inner()
+
+
+PATHS = {
+    'attr': ref.emission.inner,
+    'attr.attr.attr[idx]': ref.emission.inner.leaf.value[1],
+    'attr.attr.call()': ref.emission.inner.leaf.f(1),
+}
+
+
+def main(number=500000):
+    for name, placeholder in PATHS.items():
+        path = placeholder.__refindex__
+        get = ref.compile_path(path)
+        walked = timeit.timeit(lambda: walk(path, Root, None), number=number)
+        compiled = timeit.timeit(lambda: get(Root, None), number=number)
+        print('{:<20} walk: {:.4f}s  compiled: {:.4f}s  ({:.2f}x)'.format(
+            name, walked, compiled, walked / compiled
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Benchmark instantiating Takos with many arms
+
+PYTHONPATH=. python benchmarks/tako_bench.py
+'''
+import timeit
+
+import octako.core as tako
+from octako import ref
+
+
+def build_tako(n_arms=20):
+    '''
+    Create a Tako class with n_arms arms which each
+    refer to the previous arm
+    '''
+    arms = {'arm0': tako.in_ >> (lambda x: x + 1)}
+    for i in range(1, n_arms):
+        arms['arm{}'.format(i)] = (
+            tako.in_ >> ref.r(getattr(ref.my, 'arm{}'.format(i - 1))) >>
+            (lambda x: x + 1)
+        )
+    return type('T', (tako.Tako,), arms)
+
+
+def main(n_takos=100000, n_arms=20):
+    T = build_tako(n_arms)
+    created = timeit.timeit(T, number=n_takos)
+    print('create {} takos:            {:.4f}s'.format(n_takos, created))
+
+    def create_and_use_one():
+        T().arm0(1)
+    one = timeit.timeit(create_and_use_one, number=n_takos)
+    print('create and use one arm:       {:.4f}s'.format(one))
+
+    last = 'arm{}'.format(n_arms - 1)
+
+    def create_and_use_all():
+        getattr(T(), last)(1)
+    n = max(n_takos // 100, 1)
+    every = timeit.timeit(create_and_use_all, number=n)
+    print('create and use all arms ({}): {:.4f}s'.format(n, every))
+
+    t = T()
+    arm = getattr(t, last)
+
+    def use_all():
+        arm(1)
+    chain = timeit.timeit(use_all, number=n * 10)
+    print('use all arms of one tako ({}): {:.4f}s'.format(n * 10, chain))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,3 +2,5 @@ from octako.core import *
 from octako import ref
 from octako import flow
 from octako import bot
+from octako import profiler
+from octako import schedule
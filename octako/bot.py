@@ -125,6 +125,29 @@ class Call(Bot):
             )
 
 
+def traverse(neuron, bot):
+    '''
+    Pass a bot forward through the network starting at neuron
+    
+    The network is walked with an explicit stack rather than
+    by recursion so large networks cannot overflow the
+    stack. Each neuron is visited with bot_step which
+    returns the neuron to continue on and the heads of the
+    strands that the neuron contains. The contained strands
+    are traversed (in order) before continuing on so the
+    visit order is the same as recursing.
+    :param Neuron neuron: The neuron to start the traversal on
+    :param Bot bot: The bot to pass forward
+    '''
+    stack = [neuron]
+    while stack:
+        outgoing, heads = stack.pop().bot_step(bot)
+        if outgoing is not None:
+            stack.append(outgoing)
+        if heads:
+            stack.extend(reversed(heads))
+
+
 class _CallArgs(object):
     
     def __init__(self, func_name):
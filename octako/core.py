@@ -1,4 +1,13 @@
+import collections
+import inspect
+import multiprocessing
+import sys
+import threading
+import time
+import weakref
+
 from octako import bot
+from octako.bot import traverse
 
 '''
 Core Neuron Modules
@@ -8,6 +17,87 @@ network
 
 '''
 
+
+class Version(object):
+    '''
+    Counter used to invalidate data that has been
+    computed from the network (such as the nodes of
+    a schedule) when the network changes
+    '''
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+
+# bumped whenever neurons are connected or replaced (strands
+# do not use it, see _invalidate_strands)
+_topology = Version()
+# bumped whenever an attribute of a Tako class is assigned
+# so references can cache what they resolve to (each Tako
+# also has a version for its own attributes, see bindings_of)
+_bindings = Version()
+
+
+def invalidate_bindings():
+    '''
+    Invalidate the values that references have cached. Call
+    if an object that is referenced is changed in a way that
+    is not assigning to a Tako (such as assigning to an object
+    that is not a Tako)
+    '''
+    _bindings.bump()
+
+
+def bindings_of(obj, name):
+    '''
+    Retrieve the arm controller which keeps the version of
+    what the attributes of a Tako refer to. The version of
+    the controller is bumped when the attribute name is assigned
+    or an arm is set
+    :param obj: Tako or the arm controller of a Tako
+    :param str name: the attribute that will be cached
+    :return: the controller or None if obj is not a Tako
+    '''
+    if isinstance(obj, Tako):
+        _watch(type(obj), name)
+        return obj.__armc__
+    if isinstance(obj, Tako._TakoAttr):
+        return obj
+    return None
+
+
+def _invalidate_strands(neuron, replace_with=None):
+    '''
+    Invalidate the plans of the strands that contain the neuron
+    :param Neuron neuron: the neuron that has been changed
+    :param Neuron replace_with: the neuron that replaces neuron
+    at the ends of the strands
+    '''
+    for ref in neuron._strand_refs:
+        strand = ref()
+        if strand is None:
+            continue
+        strand._plan = None
+        if replace_with is not None:
+            if strand.lhs is neuron:
+                strand.lhs = replace_with
+            if strand.rhs is neuron:
+                strand.rhs = replace_with
+            strand._register(replace_with)
+
+
+def _watch(cls, name):
+    '''
+    Bump the version of a Tako's controller when the attribute
+    name is assigned (see Tako.__setattr__)
+    '''
+    if name not in cls._watched:
+        # set on the type so that the bindings are not bumped
+        type.__setattr__(cls, '_watched', cls._watched | {name})
+
+
 class Neuron(object):
     '''
     Neuron is a node in an information network
@@ -20,7 +110,14 @@ class Neuron(object):
     which creates a neuron of the same type with the
     members passed to the constructor
     
+    Neurons whose output does not only depend on the
+    input (because they keep state) must set stateful
+    to True so that their outputs are not reused
     '''
+    stateful = False
+    # weak references to the strands that contain the neuron
+    _strand_refs = ()
+
     def __init__(self):
         self.incoming = None
         self.outgoing = None
@@ -47,9 +144,18 @@ class Neuron(object):
         Pass a bot forward through the network
         :param Bot bot: The bot to pass forward
         '''  
+        traverse(self, bot)
+
+    def bot_step(self, bot):
+        '''
+        Visit this neuron with a bot as one step of
+        passing the bot forward
+        :param Bot bot: The bot to visit the neuron with
+        :return: (the neuron to continue on, heads of the strands
+        within this neuron that the bot must pass through)
+        '''
         self.visit(bot)
-        if self.outgoing is not None:
-            self.outgoing.bot_forward(bot)
+        return self.outgoing, None
     
     def forward(self, x, bot=None):
         '''
@@ -58,9 +164,13 @@ class Neuron(object):
         :param Bot bot: The bot to send through the netwrok
         '''
         
-        x = self(x, bot)
-        if self.outgoing is not None:
-            return self.outgoing.forward(x, bot)
+        cur = self
+        while cur is not None:
+            # retrieve outgoing before the call because
+            # a declaration will replace itself when called
+            outgoing = cur.outgoing
+            x = cur(x, bot)
+            cur = outgoing
         return x
 
     def connect(self, other):
@@ -70,6 +180,8 @@ class Neuron(object):
         '''
         other._connect_incoming(self)
         self._connect_outgoing(other)
+        _invalidate_strands(self)
+        _topology.bump()
     
     def _connect_incoming(self, other):
         '''
@@ -92,11 +204,20 @@ class Neuron(object):
         if self.incoming:
             self.incoming.outgoing = replace_with
             replace_with.incoming = self.incoming
+            _invalidate_strands(self.incoming)
         if self.outgoing:
             self.outgoing.incoming = replace_with
             replace_with.outgoing = self.outgoing
         self.incoming = None
         self.outgoing = None
+        _invalidate_strands(self, replace_with)
+        _topology.bump()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the strands are registered again when they are compiled
+        state.pop('_strand_refs', None)
+        return state
 
     def __call__(self, x, wh):
         '''
@@ -111,6 +232,37 @@ class Neuron(object):
             type(self)
         )
 
+    def call_batch(self, xs, wh=None):
+        '''
+        Execute the operation on each input in a batch.
+        Neurons which can process a batch at once (such as
+        a numpy array) should override this.
+        :param xs: The batch of inputs (a sequence or array)
+        :param warehouse wh: a warehouse to pass through the network
+        :return: the batch of outputs
+        '''
+        return [self(x, wh) for x in xs]
+
+    async def acall(self, x, wh=None):
+        '''
+        Execute the operation within an event loop. Neurons
+        which contain other neurons or call coroutines should
+        override this so that they do not block the loop.
+        :param x: The input into the neuron (can be anything)
+        :param warehouse wh: a warehouse to pass through the network
+        '''
+        return self(x, wh)
+
+
+async def _resolve(y):
+    '''
+    :param y: the output of an operation
+    :return: the awaited output if the output is awaitable
+    '''
+    if inspect.isawaitable(y):
+        return await y
+    return y
+
 
 class _In(Neuron):
     '''
@@ -149,6 +301,9 @@ class _In(Neuron):
     def __call__(self, x, wh=None):
         return x
 
+    def call_batch(self, xs, wh=None):
+        return xs
+
 
 class _Out(Neuron):
     '''
@@ -165,8 +320,8 @@ class _Out(Neuron):
     def _connect_outgoing(self, other):
         raise AttributeError('An In flow cannot have any incoming neurons')
     
-    def bot_forward(self, bot):
-        return
+    def bot_step(self, bot):
+        return None, None
 
     def __getitem__(self, key):
         return to_neuron(Sub(key))
@@ -177,6 +332,9 @@ class _Out(Neuron):
     def __call__(self, x, wh=None):
         return x
 
+    def call_batch(self, xs, wh=None):
+        return xs
+
 
 class _Nil(_In):
     '''
@@ -206,6 +364,9 @@ class _Nil(_In):
         assert x is None, 'The input to a Nil flow must be None'
         return x
 
+    def call_batch(self, xs, wh=None):
+        return Neuron.call_batch(self, xs, wh)
+
 
 class _InCreator(object):
     '''
@@ -254,6 +415,30 @@ class _NilCreator(object):
 nil_ = _NilCreator()
 
 
+def _column(xs, key):
+    '''
+    Index a column of a batch without indexing each row. 
+    The column of a numpy array is a view of the array
+    :param xs: the batch (a structured array, an array with 
+    two or more dimensions or a dict of arrays)
+    :param key: the index into each row
+    :return: (the column, True) or (None, False) if
+    the batch does not have columns
+    '''
+    if isinstance(xs, dict):
+        if key in xs:
+            return xs[key], True
+        return None, False
+    names = getattr(getattr(xs, 'dtype', None), 'names', None)
+    if names is not None:
+        if isinstance(key, str) and key in names:
+            return xs[key], True
+        return None, False
+    if getattr(xs, 'ndim', 0) > 1 and not isinstance(key, str):
+        return xs[:, key], True
+    return None, False
+
+
 class Sub(Neuron):
     '''
     Index the emission that has been passed in
@@ -269,6 +454,16 @@ class Sub(Neuron):
     
     def __call__(self, x, wh=None):
         return x[self.index]
+
+    def call_batch(self, xs, wh=None):
+        '''
+        Index the column of a 2d array, structured array
+        or dict of arrays rather than each row
+        '''
+        column, found = _column(xs, self.index)
+        if found:
+            return column
+        return super().call_batch(xs, wh)
     
     def spawn(self):
         return Sub(self.index)
@@ -279,19 +474,33 @@ class OpNeuron(Neuron):
     Calls the object/function that is passed
     in as op
     '''
-    def __init__(self, op):
+    def __init__(self, op, vectorized=False):
         '''
         :param op: a callable (takes one parameter)
+        :param bool vectorized: whether op can be passed a
+        whole batch (such as a numpy function)
         '''
         super().__init__()
         self._op = op
+        self._vectorized = vectorized
 
     def spawn(self):
-        return OpNeuron(self._op)
+        return OpNeuron(self._op, self._vectorized)
     
     def __call__(self, x, wh=None):
         return self._op(x)
 
+    def call_batch(self, xs, wh=None):
+        if self._vectorized:
+            return self._op(xs)
+        return super().call_batch(xs, wh)
+
+    async def acall(self, x, wh=None):
+        '''
+        Awaits the output of op if op is a coroutine function
+        '''
+        return await _resolve(self._op(x))
+
 
 class UnpackOpNeuron(OpNeuron):
     '''
@@ -299,11 +508,17 @@ class UnpackOpNeuron(OpNeuron):
     inputs that have been passed in
     '''
     def spawn(self):
-        return UnpackOpNeuron(self._op)
+        return UnpackOpNeuron(self._op, self._vectorized)
     
     def __call__(self, x, wh=None):
         return self._op(*x)
 
+    def call_batch(self, xs, wh=None):
+        return Neuron.call_batch(self, xs, wh)
+
+    async def acall(self, x, wh=None):
+        return await _resolve(self._op(*x))
+
 
 class Noop(Neuron):
     '''
@@ -315,6 +530,9 @@ class Noop(Neuron):
     def __call__(self, x, wh=None):
         return x
 
+    def call_batch(self, xs, wh=None):
+        return xs
+
 # TODO: Refactor.. duplicating Stem
 def _update_arg(arg, *args, **kwargs):
     if isinstance(arg, Arg):
@@ -342,19 +560,19 @@ class ArgNeuron(Neuron):
     def spawn(self):
         return ArgNeuron(self._arg)
 
-    def bot_forward(self, bot):
+    def bot_step(self, bot):
         '''
-        Pass a bot forward through the network
+        Visit the neuron and continue on from the neuron that
+        replaced it if the bot replaced it
         :param Bot bot: The bot to pass forward
         '''  
-        already_replaced = self._replaced_with = None
+        self._replaced_with = None
         self.visit(bot)
-        if not already_replaced and self._replaced_with is not None:
+        if self._replaced_with is not None:
             neuron = self._replaced_with
         else:
             neuron = self
-        if neuron.outgoing is not None:
-            neuron.outgoing.bot_forward(bot)
+        return neuron.outgoing, None
 
     def __call__(self, x, wh):
         '''
@@ -445,14 +663,7 @@ class Declaration(Neuron):
         return defined
     
     def _replace(self, replace_with):
-        if self.incoming:
-            self.incoming.outgoing = replace_with
-            replace_with.incoming = self.incoming
-        if self.outgoing:
-            self.outgoing.incoming = replace_with
-            replace_with.outgoing = self.outgoing
-        self.incoming = None
-        self.outgoing = None
+        Neuron.replace(self, replace_with)
 
     def __call__(self, x, wh=None):
         if not self._dynamic and self.defined is None:
@@ -464,6 +675,25 @@ class Declaration(Neuron):
         else:
             return self.define(x)(x, wh)
 
+    def call_batch(self, xs, wh=None):
+        if not self._dynamic and self.defined is None:
+            neuron = self.define(xs)
+            self._replace(neuron)
+            return neuron.call_batch(xs, wh)
+        elif not self._dynamic:
+            return self.defined.call_batch(xs, wh)
+        return super().call_batch(xs, wh)
+
+    async def acall(self, x, wh=None):
+        if not self._dynamic and self.defined is None:
+            neuron = self.define(x)
+            self._replace(neuron)
+            return await neuron.acall(x, wh)
+        elif not self._dynamic:
+            return await self.defined.acall(x, wh)
+        else:
+            return await self.define(x).acall(x, wh)
+
     def spawn(self):
         return Declaration(
             self.module_cls, 
@@ -578,6 +808,13 @@ class Strand(object):
     def __init__(self, neurons):
         assert len(neurons) > 0, 'There must be more than one operation'
         self.lhs, self.rhs = self._connect_ops(neurons)
+        self._neurons = None
+        self._plan = None
+        self._register(self.lhs)
+        self._register(self.rhs)
+        self._pool = None
+        self._pool_key = None
+        self._pool_finalizer = None
 
     def _connect_ops(self, neurons):
         '''
@@ -623,6 +860,7 @@ class Strand(object):
         rhs = to_neuron(neuronable)
         self.rhs.connect(rhs)
         self.rhs = rhs
+        self._register(rhs)
     
     def prepend(self, neuronable):
         '''
@@ -632,6 +870,8 @@ class Strand(object):
         lhs = to_neuron(neuronable)
         lhs.connect(self.lhs)
         self.lhs = lhs
+        self._plan = None
+        self._register(lhs)
 
     def enclose(self, left_nil=False):
         '''
@@ -673,8 +913,171 @@ class Strand(object):
         ops.append(cur.spawn())
         return Strand(ops)
 
+    def compile(self):
+        '''
+        Flatten the linked list of neurons into an execution plan
+        (a tuple of the neurons' call operators) so the strand
+        can be executed with a loop rather than by recursing
+        through each neuron's outgoing.
+        
+        The plan is compiled automatically when the strand is
+        called and recompiled if neurons in the strand have been
+        connected or replaced since.
+        :return: Strand
+        '''
+        neurons = []
+        cur = self.lhs
+        while cur is not None:
+            neurons.append(cur)
+            cur = cur.outgoing
+        self._neurons = tuple(neurons)
+        self._plan = tuple(neuron.__call__ for neuron in neurons)
+        for neuron in neurons:
+            self._register(neuron)
+        return self
+
+    def _register(self, neuron):
+        '''
+        Register the strand with the neuron so that the plan is
+        invalidated when the neuron is connected or replaced
+        '''
+        ref = weakref.ref(self)
+        refs = neuron._strand_refs
+        if not refs:
+            neuron._strand_refs = [ref]
+        elif ref not in refs:
+            # drop the strands that have been collected
+            refs[:] = [other for other in refs if other() is not None]
+            refs.append(ref)
+
+    @property
+    def neurons(self):
+        '''
+        :return: tuple of the neurons in the strand
+        '''
+        if self._plan is None:
+            self.compile()
+        return self._neurons
+
     def __call__(self, x=None, wh=None):
-        return self.lhs.forward(x, wh)
+        if self._plan is None:
+            self.compile()
+        if wh is not None and wh.begin_pass():
+            try:
+                return self(x, wh)
+            finally:
+                wh.end_pass()
+        for call in self._plan:
+            x = call(x, wh)
+        return x
+
+    def forward_batch(self, xs, wh=None):
+        '''
+        Send a batch of inputs through the strand. Each neuron
+        processes the whole batch with call_batch so neurons
+        that support batches (such as vectorized OpNeurons)
+        are called once rather than once per input.
+        :param xs: The batch of inputs (a sequence or array)
+        :param warehouse wh: a warehouse to pass through the network
+        :return: the batch of outputs
+        '''
+        if wh is not None and wh.begin_pass():
+            try:
+                return self.forward_batch(xs, wh)
+            finally:
+                wh.end_pass()
+        for neuron in self.neurons:
+            xs = neuron.call_batch(xs, wh)
+        return xs
+
+    async def acall(self, x=None, wh=None):
+        '''
+        Send an input through the strand within an event loop
+        Neurons which output coroutines are awaited and flows
+        run their branches concurrently.
+        
+        @example 
+        y = await strand.acall(x)
+        '''
+        if wh is not None and wh.begin_pass():
+            try:
+                return await self.acall(x, wh)
+            finally:
+                wh.end_pass()
+        for neuron in self.neurons:
+            x = await neuron.acall(x, wh)
+        return x
+
+    def map(self, iterable, processes=None, chunksize=1, ordered=True):
+        '''
+        Send each input in iterable through the strand using
+        a pool of worker processes. Each worker runs a spawned
+        replica of the strand. The pool is kept for later
+        calls to map until the network changes or close is called
+        (or the strand is garbage collected).
+        
+        :param iterable: the inputs to send through the strand
+        :param int processes: the number of worker processes
+        (if None the inputs are sent through in this process)
+        :param int chunksize: the number of inputs to send to a
+        worker at a time
+        :param bool ordered: whether to output the results in the
+        order of the inputs or as they complete
+        :return: iterator over the outputs
+        '''
+        if processes is None:
+            return (self(x) for x in iterable)
+
+        pool = self._map_pool(processes)
+        if ordered:
+            return pool.imap(_map_call, iterable, chunksize)
+        return pool.imap_unordered(_map_call, iterable, chunksize)
+
+    def _map_pool(self, processes):
+        '''
+        :param int processes: the number of worker processes
+        :return: multiprocessing.Pool running replicas of the current strand
+        '''
+        # the replicas are stale if any neuron in the network
+        # (including the neurons within flows) has been replaced
+        collect = _Collect()
+        self.bot_forward(collect)
+        key = (processes, tuple(collect.neurons))
+        if self._pool is not None and self._pool_key != key:
+            self.close()
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                processes, initializer=_init_map_worker,
+                initargs=(self.spawn(),)
+            )
+            self._pool_key = key
+            self._pool_finalizer = weakref.finalize(
+                self, _close_pool, self._pool
+            )
+        return self._pool
+
+    def close(self):
+        '''
+        Shut down the worker processes started by map
+        '''
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()
+        self._pool = None
+        self._pool_key = None
+        self._pool_finalizer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_neurons'] = state['_plan'] = None
+        state['_pool'] = None
+        state['_pool_key'] = None
+        state['_pool_finalizer'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._register(self.lhs)
+        self._register(self.rhs)
     
     def __rshift__(self, other):
         '''
@@ -686,6 +1089,25 @@ class Strand(object):
 
 
 Strand.__neuron__ = Strand.arm
+
+
+# the replica of the strand that a worker process
+# started by Strand.map sends its inputs through
+_map_strand = None
+
+
+def _close_pool(pool):
+    pool.terminate()
+    pool.join()
+
+
+def _init_map_worker(strand):
+    global _map_strand
+    _map_strand = strand
+
+
+def _map_call(x):
+    return _map_strand(x)
         
 
 def neuron_rshift(self, other):
@@ -695,6 +1117,55 @@ def neuron_rshift(self, other):
 Neuron.__rshift__ = neuron_rshift
 
 
+class _Collect(bot.Bot):
+    '''
+    Bot that collects the neurons in a network
+    in the order that they are visited
+    '''
+    def __init__(self):
+        super().__init__()
+        self.neurons = []
+
+    def _visit(self, neuron):
+        self.neurons.append(neuron)
+
+
+class _FindStateful(bot.Bot):
+    '''
+    Bot that checks whether a network contains a stateful neuron
+    '''
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def _visit(self, neuron):
+        if neuron.stateful:
+            self.found = True
+
+
+def is_pure(neuron):
+    '''
+    :param Neuron neuron: the neuron (or arm) to check
+    :return: whether no neuron reachable from the neuron is stateful
+    '''
+    find = _FindStateful()
+    neuron.bot_forward(find)
+    return not find.found
+
+
+def is_stateful(neuron):
+    '''
+    :param Neuron neuron: the neuron to check
+    :return: whether the neuron or a neuron in the strands
+    it contains is stateful (the neurons it outputs to are not checked)
+    '''
+    find = _FindStateful()
+    _, heads = neuron.bot_step(find)
+    for head in heads or []:
+        head.bot_forward(find)
+    return find.found
+
+
 class Arm(Neuron):
     """
     Arms wrap strands so that they can be
@@ -706,12 +1177,22 @@ class Arm(Neuron):
         self.strand = strand.enclose()
 
     def __call__(self, x, wh=None):
-        return self.strand(x)
+        return self.strand(x, wh)
+
+    def call_batch(self, xs, wh=None):
+        return self.strand.forward_batch(xs, wh)
+
+    async def acall(self, x, wh=None):
+        return await self.strand.acall(x, wh)
         
     def visit(self, bot):
         super().visit(bot)
         self.strand.bot_forward(bot)
 
+    def bot_step(self, bot):
+        Neuron.visit(self, bot)
+        return self.outgoing, [self.strand.lhs]
+
     def spawn(self):
         return Arm(self.strand.spawn())
     
@@ -747,11 +1228,44 @@ def is_arm(v):
     return isinstance(v, Strand) or isinstance(v, Arm)
 
 
+class _ArmAttr(object):
+    '''
+    Descriptor used for the arms of a Tako so that
+    retrieving an arm from a Tako instance retrieves 
+    the instance's arm rather than the class's arm
+    '''
+    def __init__(self, name, val):
+        '''
+        :param name: the name of the arm
+        :param val: the value to retrieve from the class
+        '''
+        self._name = name
+        self._val = val
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self._val
+        # a value that is not an arm may have been assigned
+        values = instance.__dict__
+        if self._name in values:
+            return values[self._name]
+        return instance.__armc__.getarm(self._name)
+
+    def __set__(self, instance, val):
+        if is_arm(val):
+            instance.__dict__.pop(self._name, None)
+            instance.__armc__.setarm(self._name, val)
+        else:
+            instance.__dict__[self._name] = val
+
+
 class _TakoType(type):
     '''
     Metaclass used for classes of type 
     Tako. It adds any class members of the
-    type 'arm' or 'strand' to the Tako type.
+    type 'arm' or 'strand' to the Tako type
+    and replaces them with a descriptor to 
+    retrieve the instance's arm.
     '''
     def __new__(cls, name, bases, attr): 
         __arms__ = {}
@@ -765,37 +1279,44 @@ class _TakoType(type):
         attr['__arms__'] = __arms__
         for k, arm in __arms__.items():
             __arms__[k] = to_arm(__arms__[k])
+            attr[k] = _ArmAttr(k, attr.get(k, __arms__[k]))
 
         return super().__new__(cls, name, bases, attr)
 
+    def __setattr__(cls, k, v):
+        super().__setattr__(k, v)
+        _bindings.bump()
+
 
 class Tako(object, metaclass=_TakoType):
     '''
     
     '''
+    # the attributes which references have cached
+    _watched = frozenset()
+
     class _TakoAttr(object):
         '''
         Helper class used by Tako to control the arms
         owner. It enables defining each arm
         in a similar manner methods with overrideing
+        
+        The arms of the class are replicated (spawned) and bound
+        to the owner the first time that they are retrieved
         '''
         def __init__(
             self, arms, cls=None
         ):
             """
-            Need to replicate the neurons
+            :param arms: the arms of the class to replicate
             """
             self._arms = {}
+            self._templates = arms
             self._parent = None
             self._owner = None
-            # self._parent = parent
-            # self._owner = owner
             self._cls = cls
-            for k, arm in arms.items():
-                copied = arm.spawn()
-                self._arms[k] = copied
-            # self.set_owner(owner)
-            # self.set_parent(parent)
+            # bumped when what an attribute refers to changes
+            self.version = 0
         
         def set_owner(self, owner):
             self._owner = owner
@@ -821,15 +1342,33 @@ class Tako(object, metaclass=_TakoType):
             res = self._arms.get(k)
             if res is not None:
                 return res
-            if res is None and self._parent:
+            if k in self._templates:
+                return self._materialize(k)
+            if self._parent:
                 return self._parent.getarm(k)
             raise AttributeError('Attribute {} does not exist.'.format(k))
+
+        def _materialize(self, k):
+            '''
+            Replicate the arm of the class and bind it to the
+            owner and parent
+            '''
+            arm = self._templates[k].spawn()
+            # the arm must be retrievable before binding it
+            # since a reference in the arm may refer to itself
+            self._arms[k] = arm
+            if self._owner is not None:
+                arm.bot_forward(bot.call.set_owner(self._owner))
+            if self._parent is not None:
+                arm.bot_forward(bot.call.set_super(self._parent))
+            return arm
     
         def setarm(self, k, v):
             arm = to_arm(v)
             self._arms[k] = arm
+            self.version += 1
             if self._parent is not None:
-                arm.bot_forward(bot.call.set_parent(self._parent))
+                arm.bot_forward(bot.call.set_super(self._parent))
             if self._owner is not None:
                 arm.bot_forward(bot.call.set_owner(self._owner))
     
@@ -860,31 +1399,15 @@ class Tako(object, metaclass=_TakoType):
     def __init__(self):
         pass
 
-    def __getattribute__(self, k):
-        try:
-            v = object.__getattribute__(self, k)
-            if is_arm(v):
-                return object.__getattribute__(self, '__armc__').getarm(k)
-            return v
-        except:
-            # Still need to check the class
-            pass
-        
-        cls = object.__getattribute__(self, '__class__')
-        if hasattr(cls, k):
-            v = getattr(cls, k)
-            if is_arm(v):
-                return object.__getattribute__(
-                    self, '__armc__'
-                ).getarm(k)
-            return v
-        raise AttributeError('Attribute {} not defined for Tako {}'.format(k, self))
-
-    def __setattribute__(self, k, v):
-        # need to walk through this
-        if is_arm(v):
-            self.__armc__.setarm(k, v)
-        object.__setattribute__(self, k, v)
+    def __setattr__(self, k, v):
+        object.__setattr__(self, k, v)
+        if k in self._watched:
+            self.__armc__.version += 1
+
+    def __delattr__(self, k):
+        object.__delattr__(self, k)
+        if k in self._watched:
+            self.__armc__.version += 1
 
 
 if __name__ == '__main__':
@@ -936,14 +1459,130 @@ class Warehouse(object):
     
     '''
     NO_OUTPUT = None, None
+
+    # the slots that have been assigned to keys
+    # (shared by all warehouses). A slot is freed
+    # when all of the neurons using it have released it
+    _slots = {}
+    _slot_keys = []
+    _slot_users = []
+    _free_slots = []
+    _slot_lock = threading.RLock()
     
-    def __init__(self):
+    def __init__(self, memoize=False):
         '''
-        
+        :param bool memoize: whether to store the outputs of the
+        neurons that are referenced so the outputs can be reused
+        if they are called with the same input in the pass 
+        (see NeuronRef)
         '''
         self._informed = None
+        self._memoize = memoize
+        self._memo = {}
+        self._in_pass = False
         self.reset()
 
+    @property
+    def memoize(self):
+        return self._memoize
+
+    @property
+    def memoizing(self):
+        '''
+        :return: whether outputs are being memoized (only within 
+        a pass through a strand)
+        '''
+        return self._in_pass
+
+    def begin_pass(self):
+        '''
+        Start a pass through the network if the warehouse memoizes
+        and a pass has not been started. The outputs memoized are
+        cleared at the start and end of the pass
+        :return: whether a pass was started
+        '''
+        if not self._memoize or self._in_pass:
+            return False
+        self._memo.clear()
+        self._in_pass = True
+        return True
+
+    def end_pass(self):
+        self._in_pass = False
+        self._memo.clear()
+
+    def recall(self, neuron, x):
+        '''
+        :return: (the output of neuron for the input object x, whether it was found)
+        '''
+        entry = self._memo.get((neuron, id(x)))
+        if entry is None:
+            return None, False
+        return entry[1], True
+
+    def memorize(self, neuron, x, y):
+        '''
+        Store the output of neuron for the input object x
+        (the input is kept so that its id cannot be reused)
+        '''
+        self._memo[(neuron, id(x))] = (x, y)
+
+    def forget(self):
+        '''
+        Clear the stored outputs
+        '''
+        self._memo.clear()
+
+    @staticmethod
+    def slot(key):
+        '''
+        Assign a slot to a key. Neurons which inform or probe
+        with the same key on each call can retrieve the
+        slot once and use inform_slot and probe_slot.
+        The slot must be released with release_slot when it
+        is no longer used so that it can be reused
+        :param key: the key to retrieve the slot for
+        :return: int
+        '''
+        with Warehouse._slot_lock:
+            slot = Warehouse._slots.get(key)
+            if slot is not None:
+                Warehouse._slot_users[slot] += 1
+                return slot
+            if Warehouse._free_slots:
+                slot = Warehouse._free_slots.pop()
+                Warehouse._slot_keys[slot] = key
+                Warehouse._slot_users[slot] = 1
+            else:
+                slot = len(Warehouse._slot_keys)
+                Warehouse._slot_keys.append(key)
+                Warehouse._slot_users.append(1)
+            Warehouse._slots[key] = slot
+            return slot
+
+    @staticmethod
+    def release_slot(slot):
+        '''
+        Release a slot retrieved with slot
+        :param int slot: the slot to release
+        '''
+        with Warehouse._slot_lock:
+            Warehouse._slot_users[slot] -= 1
+            if Warehouse._slot_users[slot] == 0:
+                del Warehouse._slots[Warehouse._slot_keys[slot]]
+                Warehouse._slot_keys[slot] = None
+                Warehouse._free_slots.append(slot)
+
+    @staticmethod
+    def lease_slot(neuron, key):
+        '''
+        Assign a slot to a key which is released when
+        the neuron is garbage collected
+        :return: (int, function to release the slot early)
+        '''
+        slot = Warehouse.slot(key)
+        return slot, weakref.finalize(neuron, Warehouse.release_slot, slot)
+
     def inform(self, key, val):
         self._informed[key] = val
     
@@ -951,12 +1590,274 @@ class Warehouse(object):
         if key in self._informed:
             return self._informed[key], True
         return default, False
+
+    def inform_slot(self, slot, val):
+        self.inform(Warehouse._slot_keys[slot], val)
+
+    def probe_slot(self, slot, default=None):
+        return self.probe(Warehouse._slot_keys[slot], default)
         
     def reset(self):
         self._informed = {}
+        self.forget()
     
     def uninform(self, key):
         self._informed.pop(key)
 
     def spawn(self):
-        return Warehouse()
+        return Warehouse(self._memoize)
+
+
+class SlotWarehouse(Warehouse):
+    '''
+    Warehouse that stores the values in a list indexed by
+    the slot of the key so informing and probing with
+    a slot is a single list index
+
+    The key is stored with the value since a slot can be 
+    reassigned to another key after it is released. Keys
+    that have not been assigned a slot are stored in a dict
+    '''
+    _EMPTY = object()
+
+    def inform(self, key, val):
+        slot = Warehouse._slots.get(key)
+        if slot is None:
+            self._unslotted[key] = val
+        else:
+            self.inform_slot(slot, val)
+
+    def probe(self, key, default=None):
+        slot = Warehouse._slots.get(key)
+        if slot is None:
+            if key in self._unslotted:
+                return self._unslotted[key], True
+            return default, False
+        return self.probe_slot(slot, default)
+
+    def inform_slot(self, slot, val):
+        entry = (Warehouse._slot_keys[slot], val)
+        try:
+            self._informed[slot] = entry
+        except IndexError:
+            self._informed.extend(
+                [self._EMPTY] * (len(Warehouse._slot_keys) - len(self._informed))
+            )
+            self._informed[slot] = entry
+
+    def probe_slot(self, slot, default=None):
+        try:
+            entry = self._informed[slot]
+        except IndexError:
+            return default, False
+        if entry is self._EMPTY or entry[0] != Warehouse._slot_keys[slot]:
+            return default, False
+        return entry[1], True
+
+    def reset(self):
+        self._informed = [self._EMPTY] * len(Warehouse._slot_keys)
+        self._unslotted = {}
+        self.forget()
+
+    def uninform(self, key):
+        slot = Warehouse._slots.get(key)
+        if slot is None:
+            self._unslotted.pop(key)
+            return
+        if self.probe_slot(slot)[1] is False:
+            raise KeyError(key)
+        self._informed[slot] = self._EMPTY
+
+    def spawn(self):
+        return SlotWarehouse(self._memoize)
+
+
+class LRUStore(object):
+    '''
+    Values stored by key in the order that they were last used
+
+    The least recently used values are evicted when there are more
+    than max_entries or their size exceeds max_bytes (nbytes
+    for numpy arrays and sys.getsizeof otherwise). Values expire
+    after ttl seconds or after max_generations calls to advance.
+    Expired values are removed when they are retrieved and from the
+    front of the order when a value is stored or a generation starts
+    so values which are not retrieved again do not accumulate.
+    '''
+    # clock to check the ttl with
+    _clock = staticmethod(time.monotonic)
+
+    def __init__(
+        self, max_entries=None, max_bytes=None, ttl=None, max_generations=None
+    ):
+        '''
+        :param int max_entries: the maximum number of values to store
+        :param int max_bytes: the maximum size of the values stored
+        :param float ttl: the number of seconds a value is valid for
+        :param int max_generations: the number of generations a value is valid for
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_generations = max_generations
+        # key -> (value, size, expiry time, generation)
+        self._entries = collections.OrderedDict()
+        self.generation = 0
+        self.nbytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _size(val):
+        nbytes = getattr(val, 'nbytes', None)
+        if isinstance(nbytes, int):
+            return nbytes
+        return sys.getsizeof(val)
+
+    def _expired(self, entry):
+        _, _, expires, generation = entry
+        if expires is not None and self._clock() >= expires:
+            return True
+        return (
+            self.max_generations is not None and
+            self.generation - generation >= self.max_generations
+        )
+
+    def _remove(self, key):
+        self.nbytes -= self._entries.pop(key)[1]
+
+    def _purge(self):
+        '''
+        Remove the expired values at the front of the order
+        '''
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._expired(entry):
+                break
+            self._remove(key)
+            self.expirations += 1
+
+    def get(self, key, default=None):
+        '''
+        :return: (the value, whether it was found)
+        '''
+        entry = self._entries.get(key)
+        if entry is None:
+            return default, False
+        if self._expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            return default, False
+        self._entries.move_to_end(key)
+        return entry[0], True
+
+    def put(self, key, val, ttl=None):
+        '''
+        :param ttl: the number of seconds the value is valid for
+        (overrides the ttl of the store)
+        '''
+        if key in self._entries:
+            self._remove(key)
+        ttl = self.ttl if ttl is None else ttl
+        size = self._size(val) if self.max_bytes is not None else 0
+        self._entries[key] = (
+            val, size, None if ttl is None else self._clock() + ttl,
+            self.generation
+        )
+        self.nbytes += size
+        self._purge()
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self.nbytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def pop(self, key):
+        val = self._entries[key][0]
+        self._remove(key)
+        return val
+
+    def advance(self):
+        '''
+        Start a new generation
+        '''
+        self.generation += 1
+        self._purge()
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+
+class BoundedWarehouse(Warehouse):
+    '''
+    Warehouse which limits the values that it stores so
+    that neurons which do not auto reset (such as BotInform with
+    auto_reset=False) do not grow it without bound
+
+    The values are stored in an LRUStore (see it for how the
+    values are evicted and expire)
+    '''
+
+    def __init__(
+        self, max_entries=None, max_bytes=None, ttl=None, max_generations=None,
+        memoize=False
+    ):
+        '''
+        :param int max_entries: the maximum number of values to store
+        :param int max_bytes: the maximum size of the values stored
+        :param float ttl: the number of seconds a value is valid for
+        :param int max_generations: the number of generations a value is valid for
+        :param bool memoize: whether to memoize the outputs of referenced neurons
+        '''
+        self._limits = max_entries, max_bytes, ttl, max_generations
+        super().__init__(memoize)
+
+    @property
+    def generation(self):
+        return self._informed.generation
+
+    @property
+    def evictions(self):
+        return self._informed.evictions
+
+    @property
+    def expirations(self):
+        return self._informed.expirations
+
+    @property
+    def nbytes(self):
+        return self._informed.nbytes
+
+    def advance(self):
+        '''
+        Start a new generation
+        '''
+        self._informed.advance()
+
+    def inform(self, key, val, ttl=None):
+        '''
+        :param ttl: the number of seconds the value is valid for
+        (overrides the ttl of the warehouse)
+        '''
+        self._informed.put(key, val, ttl)
+
+    def probe(self, key, default=None):
+        return self._informed.get(key, default)
+
+    def reset(self):
+        if self._informed is None:
+            self._informed = LRUStore(*self._limits)
+        else:
+            self._informed.clear()
+        self.forget()
+
+    def uninform(self, key):
+        self._informed.pop(key)
+
+    def spawn(self):
+        return BoundedWarehouse(*self._limits, self._memoize)
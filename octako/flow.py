@@ -1,6 +1,95 @@
-from octako.core import Neuron, to_neuron, Strand, Arm
+import asyncio
+import collections
+import contextlib
+import contextvars
+
+import numpy as np
+
+from octako.core import (
+    Neuron, to_neuron, Strand, Arm, Warehouse, LRUStore, bindings_of,
+    _bindings
+)
 from octako import ref
 
+
+# executor to run the branches of Multi and Diverge
+# on if one is not passed to the flow (set per thread/context)
+_executor = contextvars.ContextVar('executor', default=None)
+# whether the current thread is running a branch on an executor
+_in_branch = contextvars.ContextVar('in_branch', default=False)
+
+
+def set_executor(executor):
+    '''
+    Set the executor that Multi and Diverge flows run their
+    branches on when they have not been passed an executor
+    (only for the current thread or context)
+    :param executor: concurrent.futures.Executor or None to run
+    the branches one after another
+    :return: the executor that was previously set
+    '''
+    prev = _executor.get()
+    _executor.set(executor)
+    return prev
+
+
+@contextlib.contextmanager
+def use_executor(executor):
+    '''
+    Run the branches of Multi and Diverge flows on the executor
+    within the context
+
+    @example 
+    with use_executor(ThreadPoolExecutor(4)):
+        strand(x)
+    '''
+    token = _executor.set(executor)
+    try:
+        yield executor
+    finally:
+        _executor.reset(token)
+
+
+def _get_executor(executor):
+    '''
+    :param executor: the executor passed to the flow
+    :return: the executor to run the branches on or None to
+    run them one after another. Branches within a branch are
+    run one after another so that they do not wait on
+    the workers that are running them
+    '''
+    if _in_branch.get():
+        return None
+    return executor or _executor.get()
+
+
+def _run_branch(strand, x, wh):
+    token = _in_branch.set(True)
+    try:
+        return strand(x, wh)
+    finally:
+        _in_branch.reset(token)
+
+
+def _run_branches(executor, branches, wh):
+    '''
+    Run each branch on the executor
+    :param executor: concurrent.futures.Executor
+    :param branches: [(strand, input)]
+    :return: list of the outputs in the order of the branches
+    :raises: the exception of the first branch that failed
+    (the branches that have not started are cancelled)
+    '''
+    futures = [
+        executor.submit(_run_branch, strand, x, wh) for strand, x in branches
+    ]
+    try:
+        return [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
 # improve upon this to remove the side effects
 def to_strand(neuron):
     if isinstance(neuron, Strand):
@@ -11,18 +100,108 @@ def to_strand(neuron):
     return strand.enclose()
 
 
+def _head(neuron):
+    '''
+    :param neuron: Strand or Neuron
+    :return: the first neuron to pass a bot through
+    '''
+    if isinstance(neuron, Strand):
+        return neuron.lhs
+    return neuron
+
+
+def _take(xs, idx):
+    '''
+    :param xs: a batch (sequence or array)
+    :param idx: the indices of the rows to take
+    :return: the rows of the batch at idx
+    '''
+    if isinstance(xs, np.ndarray):
+        return xs[idx]
+    return [xs[i] for i in idx]
+
+
+def _group(keys):
+    '''
+    Group the rows of a batch by key
+    :param keys: the key of each row (sequence or array)
+    :return: {key: indices of the rows with the key}
+    '''
+    if isinstance(keys, np.ndarray) and keys.ndim == 1:
+        unique, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        splits = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+        return {key.item(): idx for key, idx in zip(unique, splits)}
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def _scatter(n, parts, fill=None):
+    '''
+    Put the outputs for subsets of a batch back in the
+    order of the batch
+    :param int n: the size of the batch
+    :param parts: [(indices of the rows, outputs for the rows)]
+    :param fill: the output for rows that are not in any part
+    :return: an array if the outputs are arrays with the same
+    shape (per row) otherwise a list
+    '''
+    outputs = [ys for _, ys in parts]
+    if outputs and all(isinstance(ys, np.ndarray) for ys in outputs):
+        shape = outputs[0].shape[1:]
+        if all(ys.shape[1:] == shape for ys in outputs):
+            dtype = np.result_type(*outputs)
+            filled = sum(len(idx) for idx, _ in parts) < n
+            if filled:
+                dtype = object if fill is None else np.result_type(
+                    dtype, np.asarray(fill).dtype
+                )
+            result = np.empty((n,) + shape, dtype=dtype)
+            if filled:
+                result[...] = fill
+            for idx, ys in parts:
+                result[idx] = ys
+            return result
+    result = [fill] * n
+    for idx, ys in parts:
+        for i, y in zip(idx, ys):
+            result[i] = y
+    return result
+
+
 class Flow(Neuron):
     '''
     Base class for flow neurons that contain
     other neurons
+    
+    Flows specify the neurons that they contain with
+    bot_heads. Flows which override visit or bot_down
+    instead are visited by recursing into them.
     '''
     def visit(self, bot):
         super().visit(bot)
         self.bot_down(bot)
     
     def bot_down(self, bot):
+        for head in self.bot_heads():
+            head.bot_forward(bot)
+
+    def bot_heads(self):
+        '''
+        :return: [Neuron] The first neuron of each strand
+        in the flow
+        '''
         raise NotImplementedError
 
+    def bot_step(self, bot):
+        cls = type(self)
+        if cls.visit is not Flow.visit or cls.bot_down is not Flow.bot_down:
+            return super().bot_step(bot)
+        Neuron.visit(self, bot)
+        return self.outgoing, self.bot_heads()
+
 
 class Diverge(Flow):
     '''
@@ -39,7 +218,7 @@ class Diverge(Flow):
     This will send 1, 2, and 3 through 
     p1, p2, p3 respectively.
     '''
-    def __init__(self, strands, n=None):
+    def __init__(self, strands, n=None, executor=None):
         """
         @constructor
         @param    streams - Each of the processing 
@@ -47,8 +226,12 @@ class Diverge(Flow):
          - Nerve | Strand
         @param n - number of modules 
          (if not defined will be table.maxn of streams)
+        @param executor - concurrent.futures.Executor to run 
+         the strands on (if not defined the strands are run
+         one after another unless set_executor has been called)
         """
         super().__init__()
+        self._executor = executor
         self._strands = []
         num_strands = len(strands)
         self._n = n or num_strands
@@ -62,15 +245,19 @@ class Diverge(Flow):
             else:
                 self._strands.append(to_neuron(None))
 
-    def bot_down(self, bot):
-        for strand in self._strands:
-            strand.bot_forward(bot)
+    def bot_heads(self):
+        return [_head(strand) for strand in self._strands]
     
     def __call__(self, x, wh=None):
         '''
         :param x: must be a sequence with the same length
         as the number of strands
         '''
+        executor = _get_executor(self._executor)
+        if executor is not None:
+            return _run_branches(
+                executor, zip(self._strands, x), wh
+            )
         result = []
         for i in range(self._n):
             result.append(
@@ -78,10 +265,15 @@ class Diverge(Flow):
             )
         return result
 
+    async def acall(self, x, wh=None):
+        return list(await asyncio.gather(*[
+            strand.acall(x_i, wh) for strand, x_i in zip(self._strands, x)
+        ]))
+
     def spawn(self):
         return Diverge(
             [strand.spawn() for strand in self._strands],
-            self._n
+            self._n, self._executor
         )
 
 
@@ -100,8 +292,21 @@ class Gate(Flow):
         cond=lambda x: x == 2,
         neuron=lambda x: x + 1
     )
+    
+    In batch mode the input is (batch to pass to condition,
+    batch to pass to neuron). The condition is run on the batch
+    to create a mask and the neuron is run once on the rows
+    that pass.
+    @output - {mask, <outputs with fill for the rows that fail>}
+    @example  in_ >> Gate(
+        cond=OpNeuron(lambda x: x > 0, vectorized=True),
+        neuron=OpNeuron(np.sqrt, vectorized=True),
+        batch=True, fill=0.0
+    )
     '''
-    def __init__(self, cond=None, neuron=None, pass_on=True):
+    def __init__(
+        self, cond=None, neuron=None, pass_on=True, batch=False, fill=None
+    ):
         '''
         :param cond: Condition required to pass for the input
         to go through the strand
@@ -109,15 +314,18 @@ class Gate(Flow):
         that pass
         :param pass_on: The value the output of cond
         should equal in order for the condition to pass
+        :param bool batch: whether the inputs are batches
+        :param fill: the output for rows that do not pass in batch mode
         '''
         super().__init__()
         self._cond = to_strand(cond)
         self._neuron = to_strand(neuron)
         self._pass_on = pass_on
+        self._batch = batch
+        self._fill = fill
 
-    def bot_down(self, bot):
-        self._cond.bot_forward(bot)
-        self._neuron.bot_forward(bot)
+    def bot_heads(self):
+        return [self._cond.lhs, self._neuron.lhs]
 
     def __call__(self, x, wh=None):
         '''
@@ -125,6 +333,8 @@ class Gate(Flow):
         :return passed, result: Whether the condition passed 
         and what the result is
         '''
+        if self._batch:
+            return self._gate_batch(x, wh)
         passed = self._cond(x[0]) == self._pass_on
         if passed:
             result = self._neuron(x[1], wh)
@@ -132,12 +342,41 @@ class Gate(Flow):
             result = None
         
         return passed, result
+
+    def mask(self, conds):
+        '''
+        :param conds: batch to pass to the condition
+        :return: boolean array of whether each row passes
+        '''
+        return np.asarray(self._cond.forward_batch(conds)) == self._pass_on
+
+    def _gate_batch(self, x, wh=None):
+        conds, values = x
+        mask = self.mask(conds)
+        idx = np.nonzero(mask)[0]
+        rows = _take(values, idx)
+        if len(idx) > 0:
+            rows = self._neuron.forward_batch(rows, wh)
+        return mask, _scatter(len(values), [(idx, rows)], self._fill)
+
+    async def acall(self, x, wh=None):
+        if self._batch:
+            return self._gate_batch(x, wh)
+        passed = await self._cond.acall(x[0]) == self._pass_on
+        if passed:
+            result = await self._neuron.acall(x[1], wh)
+        else:
+            result = None
+        
+        return passed, result
     
     def spawn(self):
         return Gate(
             cond=self._cond.spawn(), 
             neuron=self._neuron.spawn(),
-            pass_on=self._pass_on
+            pass_on=self._pass_on,
+            batch=self._batch,
+            fill=self._fill
         )
 
 
@@ -154,8 +393,16 @@ class Multi(Flow):
     @example strand = in_ >> Emit(1) >> Multi(p1, p2, p3)
     Here the output will be [p1(1), p2(1), p3(1)]
     '''
-    def __init__(self, strands=None, n=None):
+    def __init__(self, strands=None, n=None, executor=None):
+        '''
+        :param strands: the strands to send the input through
+        :param n: the number of strands
+        :param executor: concurrent.futures.Executor to run the strands
+        on (if not defined the strands are run one after another
+        unless set_executor has been called)
+        '''
         super().__init__()
+        self._executor = executor
         num_strands = len(strands) if strands is not None else 0
         self._n = n or num_strands
         assert num_strands <= self._n, (
@@ -168,20 +415,29 @@ class Multi(Flow):
             else:
                 self._strands.append(to_strand(None))
 
-    def bot_down(self, bot):
-        for n in self._strands:
-            n.bot_forward(bot)
+    def bot_heads(self):
+        return [strand.lhs for strand in self._strands]
 
     def __call__(self, x, wh=None):
+        executor = _get_executor(self._executor)
+        if executor is not None:
+            return _run_branches(
+                executor, [(strand, x) for strand in self._strands], wh
+            )
         result = []
         for cur_strand in self._strands:
             result.append(cur_strand(x, wh))
         return result
 
+    async def acall(self, x, wh=None):
+        return list(await asyncio.gather(*[
+            strand.acall(x, wh) for strand in self._strands
+        ]))
+
     def spawn(self):
         return Multi(
             [strand.spawn() for strand in self._strands],
-            self._n
+            self._n, self._executor
         )
 
 
@@ -218,46 +474,95 @@ class Repeat(Flow):
     )
     
     strand(0) -> [1, 2, 3]
+
+    strand = in_ >> Repeat(
+        Update(lambda x: x + 1, init_value=0) >>
+        Gate(cond=lambda x: x == 3, neuron=lambda x: x + 1), stream=True
+    )
+    
+    for y in strand(0): -> 1, 2, 3 (each step is run when it is iterated to)
     '''
     
-    def __init__(self, neuron, break_on=False, output_all=False):
+    def __init__(
+        self, neuron, break_on=False, output_all=False, stream=False,
+        keep_last=None
+    ):
         '''
         :param neuron: The neuron to repeat
         :param break_on: the value to end the repeating on
         :param output_all: whether to output the results
         of each step of the "repeated" process
+        :param stream: whether to output a generator that runs 
+        the process and yields the result of each step
+        :param int keep_last: the number of results to keep
+        if output_all (if None all results are kept)
         '''
         super().__init__()
         self._neuron = neuron
         self._strand = to_strand(neuron)
         self._break_on = break_on
         self._output_all = output_all
-    
-    def __call__(self, x, wh=None):
+        self._stream = stream
+        self._keep_last = keep_last
+
+    def _steps(self, x, wh=None):
         '''
-        Repeatedly call self._stand until finished
+        Repeatedly call self._strand until finished
+        yielding the result of each step
         '''
-        all_results = []
-        result = None
-        
         while True:
             cur_result = self._strand(x, wh)
-            if self._output_all:
-                all_results.append(cur_result[1])
-                result = all_results
-            else:
-                result = cur_result[1]
-            
+            yield cur_result[1]
             if cur_result[0] == self._break_on:
                 break
 
-        return result
+    async def _asteps(self, x, wh=None):
+        while True:
+            cur_result = await self._strand.acall(x, wh)
+            yield cur_result[1]
+            if cur_result[0] == self._break_on:
+                break
 
-    def bot_down(self, bot):
-        self._strand.bot_forward(bot)
+    def _collect(self, results):
+        '''
+        :param results: list or deque of the results of the steps
+        :return: the output of the repeat
+        '''
+        if self._output_all:
+            return list(results)
+        return results[-1]
+
+    def _buffer(self):
+        return collections.deque(
+            maxlen=self._keep_last if self._output_all else 1
+        )
+    
+    def __call__(self, x, wh=None):
+        '''
+        Repeatedly call self._stand until finished
+        '''
+        if self._stream:
+            return self._steps(x, wh)
+        results = self._buffer()
+        results.extend(self._steps(x, wh))
+        return self._collect(results)
+
+    async def acall(self, x, wh=None):
+        if self._stream:
+            return self._asteps(x, wh)
+        results = self._buffer()
+        async for result in self._asteps(x, wh):
+            results.append(result)
+        return self._collect(results)
+
+    def bot_heads(self):
+        return [self._strand.lhs]
 
     def spawn(self):
-        return Repeat(self._strand.spawn(), self._break_on, self._output_all)
+        return Repeat(
+            self._strand.spawn(), self._break_on, self._output_all,
+            self._stream, self._keep_last
+        )
 
 
 class Switch(Flow):
@@ -265,6 +570,12 @@ class Switch(Flow):
     Send the input[0] through a routing neuron
     which decides the neuron to send input[1]
     through
+    
+    In batch mode input[0] and input[1] are batches. The 
+    router is run once on the batch of input[0] and
+    each path is run once on the rows of input[1] routed
+    to it. The output is (paths, outputs) in the order
+    of the batch.
 
     @example 
     in_ >> Switch(
@@ -277,20 +588,44 @@ class Switch(Flow):
         default=p4
     )
     '''
-    def __init__(self, router, paths, default=None):
+    def __init__(self, router, paths, default=None, batch=False):
+        '''
+        :param router: neuron that outputs the path to send input[1] through
+        :param paths: {path: neuron}
+        :param default: the neuron to use if the path is not in paths
+        (if None input[1] is output)
+        :param bool batch: whether the inputs are batches
+        '''
         super().__init__()
         self._strands = {k: to_strand(neuron) for k, neuron in paths.items()}
         router = to_strand(router)
         self._default = to_strand(default) if default is not None else None
         self._router = router
+        self._batch = batch
 
-    def bot_down(self, bot):
-        self._router.bot_forward(bot)
-        for key, neu in self._strands.items():
-            neu.bot_forward(bot)
-        self._default.bot_forward(bot)
+    def bot_heads(self):
+        heads = [self._router.lhs]
+        heads.extend(strand.lhs for strand in self._strands.values())
+        if self._default is not None:
+            heads.append(self._default.lhs)
+        return heads
+
+    def _route_batch(self, x, wh=None):
+        keys, values = x
+        paths = self._router.forward_batch(keys)
+        parts = []
+        for path, idx in _group(paths).items():
+            rows = _take(values, idx)
+            if path in self._strands:
+                rows = self._strands[path].forward_batch(rows, wh)
+            elif self._default is not None:
+                rows = self._default.forward_batch(rows, wh)
+            parts.append((idx, rows))
+        return paths, _scatter(len(values), parts)
 
     def __call__(self, x, wh=None):
+        if self._batch:
+            return self._route_batch(x, wh)
         path = self._router(x[0])
         if path in self._strands:
             return path, self._strands[path](x[1], wh)
@@ -299,11 +634,23 @@ class Switch(Flow):
         else:
             return path, x[1]
 
+    async def acall(self, x, wh=None):
+        if self._batch:
+            return self._route_batch(x, wh)
+        path = await self._router.acall(x[0])
+        if path in self._strands:
+            return path, await self._strands[path].acall(x[1], wh)
+        elif self._default is not None:
+            return path, await self._default.acall(x[1], wh)
+        else:
+            return path, x[1]
+
     def spawn(self):
         return Switch(
             self._router.spawn(),
             {k: strand.spawn() for k, strand in self._strands.items()},
-            default=self._default.spawn()
+            default=self._default.spawn() if self._default is not None else None,
+            batch=self._batch
             )
 
 
@@ -324,39 +671,147 @@ class Cases(Flow):
         ],
         default=proc3
     )
+    
+    In batch mode the input is (batch for the conditions, batch of
+    values). For cases that are Gates only the conditions are
+    evaluated to assign each row to the first case it matches.
+    Then the body of each case is run once on its rows and the default
+    is run once on the rows (cond, value) that do not match.
+    The output is (path of each row, outputs).
+    
+    The number of inputs that took each path is counted in hits
+    so that the cases can be ordered by how often they match.
     '''
     NO_PATH = None
     DEFAULT_PATH = -1
     NO_OUTPUT = None
     
-    def __init__(self, cases, default=None, pass_on=True):
+    def __init__(self, cases, default=None, pass_on=True, batch=False):
         super().__init__()
         self._strands = [to_strand(neuron) for neuron in cases]
+        self._gates = [self._gate_of(strand) for strand in self._strands]
         self._default = default
         if self._default is not None:
             self._default = to_neuron(self._default)
         self._pass_on = pass_on
+        self._batch = batch
+        self.hits = collections.Counter()
 
-    def bot_down(self, bot):
-        for strand in self._strands:
-            strand.bot_forward(bot)
-        self._default.bot_forward(bot)
+    @staticmethod
+    def _gate_of(strand):
+        '''
+        :return: the Gate if the strand only consists of a Gate
+        '''
+        neurons = strand.neurons
+        if len(neurons) == 3 and isinstance(neurons[1], Gate):
+            return neurons[1]
+        return None
+
+    def reset_hits(self):
+        self.hits.clear()
+
+    def bot_heads(self):
+        heads = [strand.lhs for strand in self._strands]
+        if self._default is not None:
+            heads.append(self._default)
+        return heads
     
     def __call__(self, x, wh=None):
+        if self._batch:
+            return self._cases_batch(x, wh)
         for i, strand in enumerate(self._strands):
             output_ = strand(x, wh)
             if output_[0] == self._pass_on:
+                self.hits[i] += 1
                 return i, output_[1]
         
         if self._default is not None:
+            self.hits[self.DEFAULT_PATH] += 1
             return self.DEFAULT_PATH, self._default(x, wh)
+        self.hits[self.NO_PATH] += 1
+        return self.NO_PATH, self.NO_OUTPUT
+
+    def _match(self, i, conds, values, wh=None):
+        '''
+        Find the rows that match case i
+        :param int i: the index of the case
+        :param conds: batch for the conditions
+        :param values: batch of values
+        :return: (boolean array of the rows that match, outputs for the rows that match)
+        '''
+        gate = self._gates[i]
+        if gate is None:
+            outputs = [
+                self._strands[i]((cond, value), wh) 
+                for cond, value in zip(conds, values)
+            ]
+            matched = np.array(
+                [output_[0] == self._pass_on for output_ in outputs], dtype=bool
+            )
+            return matched, [
+                output_[1] for output_, match in zip(outputs, matched) if match
+            ]
+        
+        matched = gate.mask(conds) == self._pass_on
+        if self._pass_on is not True or not matched.any():
+            # the gate only outputs results for rows that pass
+            return matched, [None] * int(matched.sum())
+        return matched, gate._neuron.forward_batch(
+            _take(values, np.nonzero(matched)[0]), wh
+        )
+
+    def _cases_batch(self, x, wh=None):
+        conds, values = x
+        n = len(values)
+        remaining = np.arange(n)
+        if self._default is not None:
+            paths = np.full(n, self.DEFAULT_PATH)
+        else:
+            paths = np.full(n, self.NO_PATH, dtype=object)
+        parts = []
+        for i in range(len(self._strands)):
+            if len(remaining) == 0:
+                break
+            matched, outputs = self._match(
+                i, _take(conds, remaining), _take(values, remaining), wh
+            )
+            idx = remaining[matched]
+            remaining = remaining[~matched]
+            paths[idx] = i
+            self.hits[i] += len(idx)
+            if len(idx) > 0:
+                parts.append((idx, outputs))
+
+        if len(remaining) > 0 and self._default is not None:
+            parts.append((remaining, self._default.call_batch(
+                list(zip(_take(conds, remaining), _take(values, remaining))), wh
+            )))
+            self.hits[self.DEFAULT_PATH] += len(remaining)
+        elif len(remaining) > 0:
+            self.hits[self.NO_PATH] += len(remaining)
+        return paths, _scatter(n, parts, self.NO_OUTPUT)
+
+    async def acall(self, x, wh=None):
+        if self._batch:
+            return self._cases_batch(x, wh)
+        for i, strand in enumerate(self._strands):
+            output_ = await strand.acall(x, wh)
+            if output_[0] == self._pass_on:
+                self.hits[i] += 1
+                return i, output_[1]
+        
+        if self._default is not None:
+            self.hits[self.DEFAULT_PATH] += 1
+            return self.DEFAULT_PATH, await self._default.acall(x, wh)
+        self.hits[self.NO_PATH] += 1
         return self.NO_PATH, self.NO_OUTPUT
     
     def spawn(self):
         return Cases(
             cases=[strand.spawn() for strand in self._strands], 
             default=self._default.spawn() if self._default is not None else None,
-            pass_on=self._pass_on
+            pass_on=self._pass_on,
+            batch=self._batch
         )
 
 
@@ -381,9 +836,16 @@ class _Merge(Flow):
         super().__init__()
         self._to_merge = [to_strand(arg) for arg in args]
     
-    def bot_down(self, bot):
-        for neuron in self._to_merge:
-            neuron.bot_forward(bot)
+    def bot_heads(self):
+        return [strand.lhs for strand in self._to_merge]
+
+    async def _amerge(self, wh=None):
+        '''
+        Output the items to merge concurrently
+        '''
+        return await asyncio.gather(*[
+            strand.acall(None, wh) for strand in self._to_merge
+        ])
 
 
 class Onto(_Merge):
@@ -396,6 +858,9 @@ class Onto(_Merge):
             x, *[strand(None, wh) for strand in self._to_merge]
         ]
 
+    async def acall(self, x, wh=None):
+        return [x, *await self._amerge(wh)]
+
     def spawn(self):
         return Onto(*[strand.spawn() for strand in self._to_merge])
 
@@ -410,6 +875,9 @@ class Under(_Merge):
             *[strand(None, wh) for strand in self._to_merge], x
         ]
 
+    async def acall(self, x, wh=None):
+        return [*await self._amerge(wh), x]
+
     def spawn(self):
         return Under(*[strand.spawn() for strand in self._to_merge])
 
@@ -420,6 +888,7 @@ class BotInform(Flow):
     passed through with the output of the neuron 
     (It has to be a warehouse)
     '''
+    stateful = True
 
     def __init__(self, neuronable, name='', use_neuron_key=True, auto_reset=True):
         '''
@@ -434,25 +903,45 @@ class BotInform(Flow):
         self._auto_reset = auto_reset
         self._name = name
         self._use_neuron_key = use_neuron_key
+        if self._use_neuron_key is True:
+            self._key = self._name + str(hash(self))
+        else:
+            self._key = self._name
+        self._slot, self._release = Warehouse.lease_slot(self, self._key)
     
     @property
     def key(self):
-        result = self._name
-        if self._use_neuron_key is True:
-            return result + str(hash(self))
-        return result
+        return self._key
 
-    def bot_down(self, bot):
-        self._strand.bot_forward(bot)
+    def __getstate__(self):
+        state = super().__getstate__()
+        # the slot is only valid in this process
+        del state['_slot'], state['_release']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._slot, self._release = Warehouse.lease_slot(self, self._key)
+
+    def bot_heads(self):
+        return [self._strand.lhs]
 
     def __call__(self, x, wh=None):
-        key = self.key
         if not self._auto_reset:
-            y, found = wh.probe(key)
+            y, found = wh.probe_slot(self._slot)
             if found:
                 return y
         y = self._strand(x, wh)
-        wh.inform(key, y)
+        wh.inform_slot(self._slot, y)
+        return y
+
+    async def acall(self, x, wh=None):
+        if not self._auto_reset:
+            y, found = wh.probe_slot(self._slot)
+            if found:
+                return y
+        y = await self._strand.acall(x, wh)
+        wh.inform_slot(self._slot, y)
         return y
     
     def spawn(self):
@@ -466,7 +955,15 @@ class BotProbe(Neuron):
     '''
     Neuron that retrieves data from a bot
     that a particular neuron set
+
+    The neuron referred to (and the slot of its key) is
+    resolved when the reference is bound and again only if the
+    attribute of the Tako it refers to is assigned or the
+    bindings are invalidated (see invalidate_bindings)
     '''
+    stateful = True
+    # slot, bindings version, controller, controller version
+    _UNRESOLVED = None, None, None, None
 
     def __init__(self, my_ref=None, name='', default=None):
         '''
@@ -488,24 +985,91 @@ class BotProbe(Neuron):
 
         self._name = name
         self._default = default
+        # slot of the key and the neuron referred to
+        # when it was retrieved
+        self._slot = None
+        self._release = None
+        self._slot_target = None
+        self._resolved = self._UNRESOLVED
+
+    def _target(self):
+        if isinstance(self._ref, ref.RefBase):
+            return self._ref(None)
+        return self._ref
     
     @property
     def key(self):
         result = self._name
         if self._ref is not None:
-            if isinstance(self._ref, ref.RefBase):
-                my_ref = self._ref(None)
-            else:
-                my_ref = self._ref
-            return result + str(my_ref.key)
+            return result + str(self._target().key)
         return result
 
+    def set_owner(self, owner):
+        if isinstance(self._ref, ref.Owned) and self._ref.set_owner(owner):
+            self._bind()
+
+    def set_super(self, super_):
+        if isinstance(self._ref, ref.Child) and self._ref.set_super(super_):
+            self._bind()
+
+    def _bind(self):
+        try:
+            self._resolve()
+        except AttributeError:
+            # the attribute may be assigned after the arm is bound
+            self._resolved = self._UNRESOLVED
+
+    def _get_slot(self):
+        '''
+        :return: the slot of the key
+        '''
+        slot, version, controller, controller_version = self._resolved
+        if (
+            slot is not None and version == _bindings.value and
+            (controller is None or controller_version == controller.version)
+        ):
+            return slot
+        return self._resolve()
+
+    def _resolve(self):
+        '''
+        Resolve the neuron referred to and retrieve the slot of
+        its key again if it is a different neuron
+        :return: the slot of the key
+        '''
+        controller = None
+        attr = ref.attr_of_base(self._ref)
+        if attr is not None:
+            controller = bindings_of(self._ref._base_val, attr)
+        version = _bindings.value
+        controller_version = (
+            controller.version if controller is not None else None
+        )
+        target = self._target() if self._ref is not None else None
+        if self._slot is None or target is not self._slot_target:
+            if self._release is not None:
+                self._release()
+            key = self._name
+            if target is not None:
+                key += str(target.key)
+            self._slot, self._release = Warehouse.lease_slot(self, key)
+            self._slot_target = target
+        self._resolved = self._slot, version, controller, controller_version
+        return self._slot
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # the slot is only valid in this process
+        state['_slot'] = state['_release'] = state['_slot_target'] = None
+        state['_resolved'] = self._UNRESOLVED
+        return state
+
     def __call__(self, x, wh=None):
         assert x is None, (
             'x should not be defined when ' +
             'executing bot probe'
         )
-        y, found = wh.probe(self.key)
+        y, found = wh.probe_slot(self._get_slot())
         if not found:
             return self._default
         return y
@@ -519,36 +1083,228 @@ class BotProbe(Neuron):
 class Store(Flow):
     '''
     Stores the output of a neuron as the attribute "output"
+
+    The outputs can also be recorded into a preallocated numpy
+    buffer. With record='grow' the buffer doubles in size when
+    it is full. With record='ring' the last capacity outputs are kept.
+    The ring is stored twice over so that the history is always
+    a contiguous view of the buffer.
     '''
-    def __init__(self, neuronable, default=None):
+    stateful = True
+    RECORD_MODES = (None, 'grow', 'ring')
+
+    def __init__(
+        self, neuronable, default=None, record=None, capacity=64, dtype=None
+    ):
         '''
         :param neuronable: item that can be changed to a neuron
         :param default: the default value to store
+        :param str record: None, 'grow' or 'ring'
+        :param int capacity: the number of outputs to allocate room for
+        :param dtype: the dtype of the buffer (the dtype of the
+        first output if None)
         '''
         super().__init__()
+        assert record in self.RECORD_MODES, (
+            'The record mode must be one of {}'.format(self.RECORD_MODES)
+        )
+        assert capacity > 0, (
+            'The capacity must be greater than 0.'
+        )
         neuron = to_neuron(neuronable)
         self._strand = to_strand(neuron)
         self.output = None
         self._default = default
+        self._record = record
+        self._capacity = capacity
+        self._dtype = dtype
+        self._buffer = None
+        self._count = 0
+        self._pos = 0
         self.reset()
     
     def reset(self):
+        '''
+        :post: the output is set to the default and the history
+        is cleared (the buffer is kept)
+        '''
         self.output = self._default
-    
-    def bot_down(self, bot):
-        self._strand.bot_forward(bot)
+        self._count = 0
+        self._pos = 0
+
+    @property
+    def history(self):
+        '''
+        :return: np.ndarray - view of the recorded outputs from
+        oldest to newest
+        '''
+        if self._buffer is None:
+            return np.empty(0, dtype=self._dtype)
+        if self._record == 'ring':
+            end = self._pos + self._capacity
+            return self._buffer[end - self._count:end]
+        return self._buffer[:self._count]
+
+    def _allocate(self, y):
+        y = np.asarray(y, dtype=self._dtype)
+        size = self._capacity * 2 if self._record == 'ring' else self._capacity
+        self._buffer = np.empty((size,) + y.shape, dtype=y.dtype)
+
+    def _write(self, y):
+        if self._buffer is None:
+            self._allocate(y)
+        if self._record == 'ring':
+            self._buffer[self._pos] = y
+            self._buffer[self._pos + self._capacity] = y
+            self._pos = (self._pos + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+            return
+        if self._count == len(self._buffer):
+            buffer = np.empty(
+                (len(self._buffer) * 2,) + self._buffer.shape[1:],
+                dtype=self._buffer.dtype
+            )
+            buffer[:self._count] = self._buffer
+            self._buffer = buffer
+        self._buffer[self._count] = y
+        self._count += 1
+
+    def _set_output(self, y):
+        self.output = y
+        if self._record is not None:
+            self._write(y)
+
+    def bot_heads(self):
+        return [self._strand.lhs]
     
     def __call__(self, x, wh=None):
         '''
         Call the "internal" strand and store the input
         '''
         y = self._strand(x, wh)
-        self.output = y
+        self._set_output(y)
+        return y
+
+    async def acall(self, x, wh=None):
+        y = await self._strand.acall(x, wh)
+        self._set_output(y)
         return y
 
     def spawn(self):
         return Store(
-            self._strand.spawn(), self._default
+            self._strand.spawn(), self._default, self._record,
+            self._capacity, self._dtype
+        )
+
+
+def cache_key(x):
+    '''
+    The default key for Cache. numpy arrays are keyed by their
+    shape, dtype and contents and tuples/lists by the keys of
+    their elements.
+    :raises TypeError: if the input cannot be used as a key
+    '''
+    if isinstance(x, np.ndarray):
+        if x.dtype.hasobject:
+            raise TypeError('Cannot key an array of objects')
+        return (np.ndarray, x.shape, x.dtype.str, x.tobytes())
+    if isinstance(x, (tuple, list)):
+        return (type(x),) + tuple(cache_key(v) for v in x)
+    hash(x)
+    return x
+
+
+class Cache(Flow):
+    '''
+    Memoizes the outputs of a neuron. The neuron must be pure
+    (its output must only depend on the input).
+    
+    The least recently used output is evicted when the cache
+    is full and outputs older than ttl seconds are recomputed.
+    Inputs that cannot be keyed bypass the cache.
+
+    @example oc.Cache(model, maxsize=256, ttl=60.0)
+    '''
+    def __init__(self, neuronable, maxsize=128, ttl=None, key=cache_key):
+        '''
+        :param neuronable: item that can be changed to a neuron
+        :param int maxsize: the maximum number of outputs to store
+        (None to not limit)
+        :param float ttl: the number of seconds an output is valid for
+        (None for no expiry)
+        :param key: function to convert an input to a hashable key
+        '''
+        super().__init__()
+        assert maxsize is None or maxsize > 0, (
+            'The maxsize must be greater than 0.'
+        )
+        self._strand = to_strand(to_neuron(neuronable))
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._key = key
+        self.reset()
+
+    def reset(self):
+        '''
+        :post: the cache is cleared and the stats are reset
+        '''
+        self._entries = LRUStore(self._maxsize, ttl=self._ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def evictions(self):
+        return self._entries.evictions
+
+    @property
+    def expirations(self):
+        return self._entries.expirations
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bot_heads(self):
+        return [self._strand.lhs]
+
+    def _lookup(self, x):
+        '''
+        :return: (key, whether the output is cached, the output)
+        The key is None if the input cannot be keyed
+        '''
+        try:
+            key = self._key(x)
+            y, found = self._entries.get(key)
+        except TypeError:
+            return None, False, None
+        if found:
+            self.hits += 1
+            return key, True, y
+        self.misses += 1
+        return key, False, None
+
+    def _store(self, key, y):
+        if key is not None:
+            self._entries.put(key, y)
+
+    def __call__(self, x, wh=None):
+        key, cached, y = self._lookup(x)
+        if cached:
+            return y
+        y = self._strand(x, wh)
+        self._store(key, y)
+        return y
+
+    async def acall(self, x, wh=None):
+        key, cached, y = self._lookup(x)
+        if cached:
+            return y
+        y = await self._strand.acall(x, wh)
+        self._store(key, y)
+        return y
+
+    def spawn(self):
+        return Cache(
+            self._strand.spawn(), self._maxsize, self._ttl, self._key
         )
 
 
@@ -556,6 +1312,9 @@ class Delay(Neuron):
     '''
     Delays the input to be output at a later timestep
     
+    The delayed values are stored in a ring buffer so
+    each step is O(1) regardless of the count
+    
     Parameters
     ----------
     x : (some sort of input)
@@ -565,20 +1324,22 @@ class Delay(Neuron):
     x
     :example 
     '''
+    stateful = True
+
     def __init__(self, count=1, default=None):
         '''
         :param int count: The amount to delay by
         :param default: The default value to output when there is
         no input to output yet
         '''
+        super().__init__()
         assert count >= 1, (
             'The delay must be set to be ' +
             'greater than or equal to 1'
         )
         self.default = default
+        # setting the count creates the buffer
         self.count = count
-        self.vals = None
-        self.reset()
     
     @property
     def count(self):
@@ -587,7 +1348,7 @@ class Delay(Neuron):
     @count.setter
     def count(self, v):
         '''
-        Specify the delay count
+        Specify the delay count (the delayed values are reset)
         Must be creater than 0
         :param int v: The amount of delay
         '''
@@ -596,6 +1357,7 @@ class Delay(Neuron):
             'greater than 0.'
         )
         self._count = v
+        self.reset()
     
     def reset(self):
         '''
@@ -603,13 +1365,72 @@ class Delay(Neuron):
         to the default values
         '''
         self.vals = [self.default] * self.count
+        self._pos = 0
 
     def __call__(self, x, wh=None):
-        cur = self.vals.pop(0)
-        self.vals.append(x)
+        pos = self._pos
+        cur = self.vals[pos]
+        self.vals[pos] = x
+        self._pos = (pos + 1) % self._count
         return cur
 
     def spawn(self):
         return Delay(
             self.count, self.default
         )
+
+
+class ArrayDelay(Delay):
+    '''
+    Delays array inputs of a fixed shape. The delayed
+    values are stored in one preallocated numpy buffer.
+    
+    call_batch delays a whole time series (with time as
+    the first axis) in a single call.
+    
+    :example 
+    delay = ArrayDelay(2, shape=(3,))
+    delay.call_batch(np.ones((100, 3))) -> the first two rows are 0
+    '''
+    def __init__(self, count=1, shape=(), dtype=float, default=0):
+        '''
+        :param int count: The amount to delay by
+        :param tuple shape: The shape of each input
+        :param dtype: The dtype of the buffer
+        :param default: The value to output when there is
+        no input to output yet
+        '''
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        super().__init__(count, default)
+
+    def reset(self):
+        self.vals = np.full(
+            (self.count,) + self.shape, self.default, dtype=self.dtype
+        )
+        self._pos = 0
+
+    def __call__(self, x, wh=None):
+        pos = self._pos
+        cur = self.vals[pos].copy()
+        self.vals[pos] = x
+        self._pos = (pos + 1) % self._count
+        return cur
+
+    def call_batch(self, xs, wh=None):
+        '''
+        :param xs: array of inputs with time as the first axis
+        :return: the delayed array
+        '''
+        xs = np.asarray(xs, dtype=self.dtype)
+        # oldest value first
+        history = np.roll(self.vals, -self._pos, axis=0)
+        series = np.concatenate([history, xs])
+        self.vals[:] = series[len(xs):]
+        self._pos = 0
+        return series[:len(xs)]
+
+    def spawn(self):
+        return ArrayDelay(
+            self.count, self.shape, self.dtype, self.default
+        )
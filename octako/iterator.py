@@ -153,11 +153,31 @@ class MetaAccessorNeuron(tako.Neuron):
 class Shuffle(MetaAccessor):
     '''
     Access the data in random order
+    
+    Only a permutation of the indices into the data is stored.
+    With block_size the data is accessed in contiguous
+    blocks (in random order) so that data which is
+    slow to seek (such as a memory mapped array) is read in chunks
     '''
     
-    def __init__(self, data=None):
-        super().__init__(data)
+    def __init__(self, data=None, seed=None, block_size=None):
+        '''
+        :param data: the data to access
+        :param int seed: the seed for the order (the order of each
+        epoch is seeded with seed + epoch). If None the order is not
+        reproducible
+        :param int block_size: the number of contiguous items to access
+        together (None to shuffle each item)
+        '''
+        assert block_size is None or block_size > 0, (
+            'The block size must be greater than 0.'
+        )
+        super().__init__()
+        self._seed = seed
+        self._block_size = block_size
+        self.epoch = 0
         self._order = None
+        self.data = data
 
     @property
     def data(self):
@@ -170,10 +190,37 @@ class Shuffle(MetaAccessor):
         the data
         '''
         self._data = data
-        if data is not None:
-            self._order = np.random.permutation(data)
-        else:
-            self._order = []
+        self._shuffle()
+
+    def new_epoch(self):
+        '''
+        Advance to the next epoch and create a new order
+        '''
+        self.epoch += 1
+        self._shuffle()
+
+    def _random_state(self):
+        if self._seed is None:
+            return np.random
+        return np.random.RandomState(self._seed + self.epoch)
+
+    def _shuffle(self):
+        if self._data is None:
+            self._order = np.empty(0, dtype=np.intp)
+            return
+        n = len(self._data)
+        # the smallest type that can index the data
+        dtype = np.uint32 if n < 2 ** 32 else np.intp
+        random_state = self._random_state()
+        if self._block_size is None:
+            self._order = random_state.permutation(n).astype(dtype)
+            return
+        size = self._block_size
+        blocks = random_state.permutation(-(-n // size))
+        order = (
+            blocks[:, np.newaxis] * size + np.arange(size)
+        ).ravel()
+        self._order = order[order < n].astype(dtype)
 
     def __len__(self):
         return len(self._data)
@@ -185,7 +232,7 @@ class Shuffle(MetaAccessor):
         self._data[self._order[idx]] = val
 
     def spawn(self):
-        return Shuffle(self._spawn_data())
+        return Shuffle(self._spawn_data(), self._seed, self._block_size)
 
 
 class Batch(MetaAccessor):
@@ -301,6 +348,7 @@ class Iterate(tako.Neuron):
     that is passed in until the iterator
     reaches the end
     '''
+    stateful = True
     
     AT_END = False, None
     
@@ -0,0 +1,239 @@
+import contextvars
+import time
+
+import octako.core as tako
+
+'''
+Profiling of the neurons in a network
+
+A profiler attaches to a strand, neuron or tako
+and records the calls of every neuron that the bot
+traversal reaches.
+
+profiler = Profiler()
+profiler.attach(my_tako)
+my_tako.predict(x)
+print(profiler.report())
+profiler.detach()
+
+The class of each attached neuron is replaced with a subclass
+that records the calls, so the calls made through refs,
+forward_batch, acall and schedules are profiled as well
+(a batch counts as one call). Neurons which are not attached
+have no overhead.
+'''
+
+
+class NeuronStats(object):
+    '''
+    The statistics recorded for a neuron
+    '''
+    def __init__(self, label):
+        '''
+        :param str label: the label of the neuron
+        (position and class)
+        '''
+        self.label = label
+        self.parent = None
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.exceptions = 0
+
+    def reset(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.exceptions = 0
+
+
+class Profiler(object):
+    '''
+    Records the number of calls, the total time, the
+    time spent in the neuron itself (excluding the neurons
+    it contains) and the number of exceptions for each neuron
+    '''
+    COLUMNS = ('label', 'parent', 'calls', 'total', 'self', 'exceptions')
+    SORT_KEYS = {
+        'calls': lambda stats: stats.calls,
+        'total': lambda stats: stats.total,
+        'self': lambda stats: stats.self_time,
+        'exceptions': lambda stats: stats.exceptions,
+    }
+
+    def __init__(self, target=None):
+        '''
+        :param target: Strand, Neuron or Tako to attach to
+        '''
+        self._stats = {}
+        self._classes = {}
+        # the entry of the call being profiled in the current context
+        self._current = contextvars.ContextVar('profiled', default=None)
+        if target is not None:
+            self.attach(target)
+
+    def attach(self, target, prefix=''):
+        '''
+        Profile each neuron in target
+        :param target: Strand, Neuron or Tako
+        :param str prefix: prefix to add to the labels
+        '''
+        if isinstance(target, tako.Tako):
+            for name in self._arm_names(target):
+                self.attach(
+                    target.__armc__.getarm(name).strand,
+                    '{}{}/'.format(prefix, name)
+                )
+            return self
+        if isinstance(target, tako.Strand):
+            target = target.lhs
+
+        collect = tako._Collect()
+        target.bot_forward(collect)
+        for position, neuron in enumerate(collect.neurons):
+            if neuron in self._classes:
+                continue
+            stats = self._stats.get(neuron)
+            if stats is None:
+                stats = NeuronStats('{}{}:{}'.format(
+                    prefix, position, type(neuron).__name__
+                ))
+            self._wrap(neuron, stats)
+            # strands must recompile their plans to call the wrappers
+            tako._invalidate_strands(neuron)
+        return self
+
+    @staticmethod
+    def _arm_names(target):
+        names = []
+        for cls in type(target).__mro__:
+            for name in getattr(cls, '__arms__', {}):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def _start(self, stats):
+        '''
+        :return: the entry for the call [stats, time in the neurons
+        it calls, parent entry, token, start] or None if the neuron
+        is calling itself (such as in the default call_batch)
+        '''
+        parent = self._current.get()
+        if parent is not None and parent[0] is stats:
+            return None
+        if stats.parent is None and parent is not None:
+            stats.parent = parent[0].label
+        entry = [stats, 0.0, parent, None, None]
+        entry[3] = self._current.set(entry)
+        entry[4] = time.perf_counter()
+        return entry
+
+    def _stop(self, entry):
+        stats, child_time, parent, token, start = entry
+        elapsed = time.perf_counter() - start
+        self._current.reset(token)
+        stats.calls += 1
+        stats.total += elapsed
+        stats.self_time += elapsed - child_time
+        if parent is not None:
+            parent[1] += elapsed
+
+    def _record(self, stats, call, *args):
+        entry = self._start(stats)
+        if entry is None:
+            return call(*args)
+        try:
+            return call(*args)
+        except BaseException:
+            stats.exceptions += 1
+            raise
+        finally:
+            self._stop(entry)
+
+    def _wrap(self, neuron, stats):
+        '''
+        Replace the neuron's class with a subclass whose call
+        operators record the calls
+        '''
+        base = type(neuron)
+        profiler = self
+
+        def __call__(self, x, wh=None):
+            return profiler._record(stats, base.__call__, self, x, wh)
+
+        def call_batch(self, xs, wh=None):
+            return profiler._record(stats, base.call_batch, self, xs, wh)
+
+        async def acall(self, x, wh=None):
+            entry = profiler._start(stats)
+            if entry is None:
+                return await base.acall(self, x, wh)
+            try:
+                return await base.acall(self, x, wh)
+            except BaseException:
+                stats.exceptions += 1
+                raise
+            finally:
+                profiler._stop(entry)
+
+        neuron.__class__ = type(base.__name__, (base,), {
+            '__call__': __call__, 'call_batch': call_batch,
+            'acall': acall, '__module__': base.__module__
+        })
+        self._classes[neuron] = base
+        self._stats[neuron] = stats
+
+    def detach(self):
+        '''
+        Stop profiling the neurons (the stats are kept)
+        '''
+        for neuron, base in self._classes.items():
+            neuron.__class__ = base
+            tako._invalidate_strands(neuron)
+        self._classes = {}
+
+    def reset(self):
+        for stats in self._stats.values():
+            stats.reset()
+
+    def stats(self, sort_by='self'):
+        '''
+        :param str sort_by: 'self', 'total', 'calls' or 'exceptions'
+        :return: [NeuronStats] sorted in descending order
+        '''
+        return sorted(
+            self._stats.values(), key=self.SORT_KEYS[sort_by], reverse=True
+        )
+
+    def report(self, sort_by='self', limit=None):
+        '''
+        :param str sort_by: 'self', 'total', 'calls' or 'exceptions'
+        :param int limit: the maximum number of neurons to output
+        :return: str - a table with a row for each neuron
+        '''
+        rows = [
+            (
+                stats.label, stats.parent or '', str(stats.calls),
+                '{:.6f}'.format(stats.total), '{:.6f}'.format(stats.self_time),
+                str(stats.exceptions)
+            )
+            for stats in self.stats(sort_by)[:limit]
+        ]
+        widths = [
+            max([len(column)] + [len(row[i]) for row in rows])
+            for i, column in enumerate(self.COLUMNS)
+        ]
+        lines = []
+        for row in [self.COLUMNS] + rows:
+            lines.append('  '.join(
+                # left align the labels and right align the numbers
+                value.ljust(width) if i < 2 else value.rjust(width)
+                for i, (value, width) in enumerate(zip(row, widths))
+            ).rstrip())
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.detach()
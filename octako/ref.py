@@ -1,5 +1,6 @@
 import octako.core as tako
 from octako import to_neuron
+import operator
 import types
 import inspect
 
@@ -70,12 +71,128 @@ class Idx(object):
         return obj[self._key]
 
 
+def _chain(getters):
+    '''
+    :return: function which applies each of the getters in turn
+    '''
+    if len(getters) == 1:
+        return getters[0]
+    
+    def get(obj):
+        for getter in getters:
+            obj = getter(obj)
+        return obj
+    return get
+
+
+def _merge_getters(path):
+    '''
+    Convert consecutive Attrs (with string keys) into one attrgetter
+    and each Idx into an itemgetter
+    :param path: [Attr or Idx]
+    '''
+    getters = []
+    attrs = []
+    for p in path:
+        if isinstance(p, Attr) and isinstance(p._key, str):
+            attrs.append(p._key)
+            continue
+        if attrs:
+            getters.append(operator.attrgetter('.'.join(attrs)))
+            attrs = []
+        if isinstance(p, Idx):
+            getters.append(operator.itemgetter(p._key))
+        else:
+            getters.append(p.get)
+    if attrs:
+        getters.append(operator.attrgetter('.'.join(attrs)))
+    return getters
+
+
+def _cached_attr(key):
+    '''
+    :return: function which retrieves the attribute key and caches
+    it if the object is a Tako (or its arm controller) until 
+    the bindings change
+    '''
+    getter = operator.attrgetter(key)
+    # object, controller, bindings version, controller version, attribute
+    cache = [None, None, None, None, None]
+
+    def get(obj):
+        if (
+            cache[0] is obj and cache[2] == tako._bindings.value and 
+            cache[3] == cache[1].version
+        ):
+            return cache[4]
+        controller = tako.bindings_of(obj, key)
+        if controller is None:
+            return getter(obj)
+        version = tako._bindings.value, controller.version
+        val = getter(obj)
+        cache[:] = [obj, controller, *version, val]
+        return val
+    return get
+
+
+def compile_path(path, cache_methods=False):
+    '''
+    Compile the path of a reference into a function(val, x) which
+    retrieves the value from val. The gets before an InCall
+    are merged into one getter except for the last
+    one since the InCall needs the object the function belongs to
+    :param path: [Attr, Idx or InCall]
+    :param bool cache_methods: whether to cache the function retrieved
+    from the base value for the first InCall (if the base
+    is a Tako and the path starts with its attribute)
+    '''
+    if not path:
+        return lambda val, x: val
+    
+    steps = []
+    gets = []
+    for p in path:
+        if isinstance(p, InCall):
+            if len(gets) > 1:
+                steps.append((_chain(_merge_getters(gets[:-1])), None))
+            if (
+                cache_methods and not steps and len(gets) == 1 and
+                isinstance(gets[0], Attr) and isinstance(gets[0]._key, str)
+            ):
+                steps.append((_cached_attr(gets[0]._key), None))
+            elif gets:
+                steps.append((_chain(_merge_getters(gets[-1:])), None))
+            gets = []
+            steps.append((None, p))
+        else:
+            gets.append(p)
+    if gets:
+        steps.append((_chain(_merge_getters(gets)), None))
+    
+    if len(steps) == 1 and steps[0][1] is None:
+        getter = steps[0][0]
+        return lambda val, x: getter(val)
+
+    def get_val(val, x):
+        prev_val = None
+        for getter, in_call in steps:
+            if in_call is None:
+                prev_val, val = val, getter(val)
+            else:
+                prev_val, val = val, in_call([val, x, prev_val])
+        return val
+    return get_val
+
+
 class RefBase(tako.Neuron):
     '''
     @abstract
     Base nerve for all value references 
     (i.e. references to items other than arms)
     '''
+    # whether the base value is the same on each call
+    # (so the methods retrieved from it can be cached)
+    _fixed_base = True
     
     def __init__(self, path=None):
         """
@@ -86,39 +203,24 @@ class RefBase(tako.Neuron):
         super().__init__()
         self._path = path or []
         self._base_val = None
+        if type(self._path) == str:
+            self._get = None
+        else:
+            self._get = compile_path(self._path, self._fixed_base)
+            # the functions called in the path may depend on
+            # or change state so the output cannot be reused
+            if any(isinstance(p, InCall) for p in self._path):
+                self.stateful = True
 
-    @staticmethod
-    def _get_val(path, val, x):
-        '''
-        :param path: The path specifying the value to retrieve (self._path)
-        :param val: the base value to retrieve from
-        :param x: The input into the neuron
-        '''
-        prev_prev_val = None
-        prev_val = val
-        for p in path:
-            if type(p) == InCall:
-                val = p([prev_val, x, prev_prev_val])
-            else:
-                val = p.get(prev_val)
-            prev_prev_val = prev_val
-            prev_val = val
-        return val
-  
     def __call__(self, x, wh=None):
         '''
         Evaluates the reference and
         returns it
         '''
         
-        path = self._path
-        
-        if type(path) == str:
-            val = self._base_val[path]
-        else:
-            val = self._get_val(path, self._base_val, x)
-        
-        return val
+        if self._get is None:
+            return self._base_val[self._path]
+        return self._get(self._base_val, x)
 
 
 class Child(object):
@@ -177,10 +279,30 @@ class EmissionRef(RefBase):
     Emission Ref allows one to access members of the
     emission that was passed in and perform operations such as indexing
     '''
+    _fixed_base = False
+
     def __call__(self, x, wh=None):
         self._base_val = x
         return super().__call__(x, wh)
 
+    def call_batch(self, xs, wh=None):
+        '''
+        Index the columns of the batch if the path only
+        consists of indices (see Sub.call_batch) rather than
+        evaluating the reference on each row
+        '''
+        path = [self._path] if type(self._path) == str else self._path
+        if not all(isinstance(p, (Idx, str)) for p in path):
+            return super().call_batch(xs, wh)
+        column = xs
+        for p in path:
+            column, found = tako._column(
+                column, p if type(p) == str else p._key
+            )
+            if not found:
+                return super().call_batch(xs, wh)
+        return column
+
     def spawn(self):
         return EmissionRef(self._path)
 
@@ -256,23 +378,69 @@ class ValRef(RefBase):
         return ValRef(self._base_val, self._path)
 
 
+def attr_of_base(ref):
+    '''
+    :param ref: the reference
+    :return: the name of the attribute of the owner (or super)
+    that ref refers to or None if ref is not a MyRef or
+    SuperRef that refers to one attribute
+    '''
+    if (
+        isinstance(ref, (MyRef, SuperRef)) and
+        type(ref._path) == list and len(ref._path) == 1 and
+        isinstance(ref._path[0], Attr) and
+        isinstance(ref._path[0]._key, str)
+    ):
+        return ref._path[0]._key
+    return None
+
+
 class NeuronRef(tako.Neuron, Owned, Child):
+    _UNRESOLVED = None, None, None, None
+
     def __init__(self, ref):
         super().__init__()
         self._ref = tako.to_neuron(ref)
+        # (neuron, topology version, whether it is pure)
+        self._purity = None, None, False
+        # the neuron that the ref resolves to can be cached if
+        # it is an attribute of the owner (a Tako)
+        self._cacheable = attr_of_base(self._ref) is not None
+        # (controller, bindings version, controller version, neuron)
+        self._resolved = self._UNRESOLVED
         Owned.__init__(self)
         Child.__init__(self)
     
     @property
     def ref_key(self, x=None):
         return self._ref(x).key
+
+    def _is_pure(self, neuron):
+        referenced, version, pure = self._purity
+        if referenced is not neuron or version != tako._topology.value:
+            pure = tako.is_pure(neuron)
+            self._purity = neuron, tako._topology.value, pure
+        return pure
     
     def __call__(self, x, wh=None):
         neuron = self.get_ref(x)
-        return neuron(x, wh)
+        if wh is None or not wh.memoizing or not self._is_pure(neuron):
+            return neuron(x, wh)
+        # reuse the output if the neuron has already been
+        # called with x in this pass
+        y, found = wh.recall(neuron, x)
+        if not found:
+            y = neuron(x, wh)
+            wh.memorize(neuron, x, y)
+        return y
+
+    async def acall(self, x, wh=None):
+        neuron = self.get_ref(x)
+        return await neuron.acall(x, wh)
     
     def set_super(self, super_):
         if Child.set_super(self, super_):
+            self._resolved = self._UNRESOLVED
             if isinstance(self._ref, Child):
                 if not self._ref.set_super(super_):
                     raise Exception(
@@ -283,6 +451,7 @@ class NeuronRef(tako.Neuron, Owned, Child):
 
     def set_owner(self, owner):
         if Owned.set_owner(self, owner):
+            self._resolved = self._UNRESOLVED
             if isinstance(self._ref, Owned):
                 if not self._ref.set_owner(owner):
                     raise Exception(
@@ -292,15 +461,35 @@ class NeuronRef(tako.Neuron, Owned, Child):
         return False
     
     def get_ref(self, x=None):
-        return self._ref(x)
+        if not self._cacheable:
+            return self._ref(x)
+        controller, version, controller_version, neuron = self._resolved
+        if (
+            controller is not None and version == tako._bindings.value and
+            controller_version == controller.version
+        ):
+            return neuron
+        controller = tako.bindings_of(
+            self._ref._base_val, attr_of_base(self._ref)
+        )
+        if controller is None:
+            return self._ref(x)
+        version, controller_version = tako._bindings.value, controller.version
+        neuron = self._ref(x)
+        self._resolved = controller, version, controller_version, neuron
+        return neuron
 
     def visit(self, bot):
         super().visit(bot)
         neuron = self.get_ref(self._ref)
         neuron.bot_forward(bot)
 
+    def bot_step(self, bot):
+        tako.Neuron.visit(self, bot)
+        return self.outgoing, [self.get_ref(self._ref)]
+
     def spawn(self):
-        return NeuronRef(self._ref)
+        return NeuronRef(self._ref.spawn())
 
 
 def r(ref):
@@ -320,7 +509,14 @@ class InCall(tako.Neuron, Owned, Child):
     def __init__(self, *args, **kwargs):
         super().__init__()
         self._args = [self._prepare_arg(arg) for arg in args]
-        self._kwargs = {k: self._prepare_arg(arg) for k, arg in kwargs}
+        self._kwargs = {k: self._prepare_arg(arg) for k, arg in kwargs.items()}
+        # the positions of the args that must be evaluated on each call
+        self._ref_args = [
+            (i, arg) for i, arg in enumerate(self._args) if isinstance(arg, RefBase)
+        ]
+        self._ref_kwargs = [
+            (k, arg) for k, arg in self._kwargs.items() if isinstance(arg, RefBase)
+        ]
         Owned.__init__(self)
         Child.__init__(self)
         # not sure if i need this????
@@ -334,20 +530,21 @@ class InCall(tako.Neuron, Owned, Child):
         else:
             return arg
     
-    @staticmethod
-    def _output_arg(arg, x):
-        if isinstance(arg, RefBase):
-            return arg(x[1])
-        else:
-            return arg
-
     def __call__(self, x, wh=None):
         """
         @param x[0] - function to call
         @param x[1] - input
         """
-        args_output = [self._output_arg(arg, x) for arg in self._args]
-        kwargs_output = {k: self._output_arg(arg, x) for k, arg in self._kwargs.items()}
+        args_output = self._args
+        if self._ref_args:
+            args_output = list(args_output)
+            for i, arg in self._ref_args:
+                args_output[i] = arg(x[1])
+        kwargs_output = self._kwargs
+        if self._ref_kwargs:
+            kwargs_output = dict(kwargs_output)
+            for k, arg in self._ref_kwargs:
+                kwargs_output[k] = arg(x[1])
         
         # not sure if i need this
         if type(x[0]) == types.MethodType and x[2] and isinstance(x[2], type):
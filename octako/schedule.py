@@ -0,0 +1,296 @@
+import collections
+import concurrent.futures
+import time
+
+import octako.core as tako
+from octako import flow
+
+'''
+Scheduling of a strand as a dependency graph
+
+The strand is expanded into a graph of nodes. Multi, Diverge,
+Onto and Under are expanded into their strands so that the
+strands run in parallel, and the strands that Onto and Under
+merge in (which do not take an input) can start at the
+beginning of the pass. Other neurons are run as one node.
+
+schedule = Schedule(strand, max_workers=4)
+y = schedule(x)
+print(schedule.report.critical_path)
+
+Stateful neurons (and neurons which contain them) are run in
+the order that the strand would run them.
+'''
+
+
+class Node(object):
+    '''
+    A unit of work in the graph
+    '''
+    def __init__(self, label, call, inputs=(), inline=False):
+        '''
+        :param str label: the label of the node
+        :param call: function(list of the outputs of the inputs, wh)
+        :param inputs: [Node] - the nodes whose outputs are passed in
+        :param bool inline: whether the node is cheap enough to run
+        in the scheduling thread
+        '''
+        self.label = label
+        self.call = call
+        self.inputs = list(inputs)
+        # nodes which must be run first but are not passed in
+        self.after = []
+        self.dependents = []
+        self.inline = inline
+
+
+class ScheduleReport(object):
+    '''
+    The timing of a run of a schedule
+    '''
+    def __init__(self, wall_time, work_time, critical_path, critical_time):
+        '''
+        :param float wall_time: the time the run took
+        :param float work_time: the time spent running the nodes
+        :param [str] critical_path: the labels of the longest chain of nodes
+        :param float critical_time: the time spent running the critical path
+        '''
+        self.wall_time = wall_time
+        self.work_time = work_time
+        self.critical_path = critical_path
+        self.critical_time = critical_time
+
+    @property
+    def parallelism(self):
+        if self.wall_time == 0.0:
+            return 1.0
+        return self.work_time / self.wall_time
+
+
+def _join(args, wh=None):
+    return list(args)
+
+
+def _pick(i):
+    def pick(args, wh=None):
+        return args[0][i]
+    return pick
+
+
+def _constant(args, wh=None):
+    return None
+
+
+def _caller(neuron):
+    def call(args, wh=None):
+        return neuron(args[0], wh)
+    return call
+
+
+def _timed(call, args, wh):
+    start = time.perf_counter()
+    y = call(args, wh)
+    return y, start, time.perf_counter()
+
+
+class _Builder(object):
+    '''
+    Expands a strand into nodes in the order the strand runs them
+    '''
+    # neurons which output their input
+    IDENTITY = (tako._In, tako._Out, tako.Noop)
+
+    def __init__(self):
+        self.nodes = []
+        self._last_stateful = None
+
+    def add(self, label, call, inputs=(), inline=False, stateful=False):
+        node = Node(
+            '{}:{}'.format(len(self.nodes), label), call, inputs, inline
+        )
+        if stateful:
+            if self._last_stateful is not None:
+                node.after.append(self._last_stateful)
+            self._last_stateful = node
+        self.nodes.append(node)
+        return node
+
+    def expand(self, neuron, source):
+        '''
+        :param neuron: Strand, Arm or Neuron
+        :param Node source: the node which outputs the input
+        :return: Node - the node which outputs the output
+        '''
+        if isinstance(neuron, tako.Strand):
+            neurons = neuron.neurons
+        elif isinstance(neuron, tako.Arm):
+            neurons = neuron.strand.neurons
+        else:
+            neurons = [neuron]
+        cur = source
+        for neuron in neurons:
+            cur = self._expand_neuron(neuron, cur)
+        return cur
+
+    def _expand_neuron(self, neuron, cur):
+        if type(neuron) in self.IDENTITY:
+            return cur
+        if isinstance(neuron, flow.Multi):
+            return self.add('Multi', _join, [
+                self.expand(strand, cur) for strand in neuron._strands
+            ], inline=True)
+        if isinstance(neuron, flow.Diverge):
+            return self.add('Diverge', _join, [
+                self.expand(
+                    strand, self.add('Diverge[{}]'.format(i), _pick(i), [cur], inline=True)
+                ) for i, strand in enumerate(neuron._strands)
+            ], inline=True)
+        if isinstance(neuron, (flow.Onto, flow.Under)):
+            none = self.add('None', _constant, inline=True)
+            merged = [self.expand(strand, none) for strand in neuron._to_merge]
+            if isinstance(neuron, flow.Onto):
+                inputs = [cur] + merged
+            else:
+                inputs = merged + [cur]
+            return self.add(type(neuron).__name__, _join, inputs, inline=True)
+        return self.add(
+            type(neuron).__name__, _caller(neuron), [cur],
+            stateful=tako.is_stateful(neuron)
+        )
+
+
+class Schedule(object):
+    '''
+    Runs a strand by running each node on a thread pool
+    as soon as the nodes it depends on have been run
+    '''
+    def __init__(self, strand, executor=None, max_workers=None):
+        '''
+        :param Strand strand: the strand to run
+        :param executor: concurrent.futures.Executor to run the nodes on
+        (a thread pool is created if not defined)
+        :param int max_workers: the number of threads in the pool
+        '''
+        self._strand = strand
+        self._executor = executor
+        self._max_workers = max_workers
+        self._pool = None
+        self._version = None
+        self._source = None
+        self._output = None
+        self.nodes = []
+        self.report = None
+
+    def compile(self):
+        '''
+        Expand the strand into nodes (the schedule is compiled
+        automatically when the network changes)
+        '''
+        builder = _Builder()
+        self._source = builder.add('In', None, inline=True)
+        self._output = builder.expand(self._strand, self._source)
+        for node in builder.nodes:
+            for dependency in node.inputs + node.after:
+                dependency.dependents.append(node)
+        self.nodes = builder.nodes
+        self._version = tako._topology.value
+
+    def _get_executor(self):
+        if self._executor is not None:
+            return self._executor
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(self._max_workers)
+        return self._pool
+
+    def close(self):
+        '''
+        Shut down the thread pool created by the schedule
+        '''
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __call__(self, x=None, wh=None):
+        if self._version != tako._topology.value:
+            self.compile()
+        if wh is not None and wh.begin_pass():
+            try:
+                return self(x, wh)
+            finally:
+                wh.end_pass()
+        executor = self._get_executor()
+        waiting = {
+            node: len(node.inputs) + len(node.after) for node in self.nodes
+        }
+        values = {}
+        times = {}
+        ready = collections.deque()
+        running = {}
+
+        def complete(node, y, start, end):
+            values[node] = y
+            times[node] = (start, end)
+            for dependent in node.dependents:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+
+        begin = time.perf_counter()
+        for node in self.nodes:
+            if node is not self._source and waiting[node] == 0:
+                ready.append(node)
+        complete(self._source, x, begin, begin)
+        while ready or running:
+            while ready:
+                node = ready.popleft()
+                args = [values[input_] for input_ in node.inputs]
+                if node.inline:
+                    complete(node, *_timed(node.call, args, wh))
+                else:
+                    running[executor.submit(_timed, node.call, args, wh)] = node
+            if not running:
+                continue
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                node = running.pop(future)
+                try:
+                    result = future.result()
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    raise
+                complete(node, *result)
+
+        self.report = self._report(times, time.perf_counter() - begin)
+        return values[self._output]
+
+    def _report(self, times, wall_time):
+        '''
+        Find the chain of nodes that took the longest
+        '''
+        path_time = {}
+        previous = {}
+        for node in self.nodes:
+            start, end = times[node]
+            slowest = max(
+                node.inputs + node.after, key=lambda dep: path_time[dep],
+                default=None
+            )
+            previous[node] = slowest
+            path_time[node] = (end - start) + (
+                path_time[slowest] if slowest is not None else 0.0
+            )
+        node = max(self.nodes, key=lambda node: path_time[node])
+        critical_time = path_time[node]
+        path = []
+        while node is not None:
+            if not node.inline:
+                path.append(node.label)
+            node = previous[node]
+        return ScheduleReport(
+            wall_time,
+            sum(end - start for start, end in times.values()),
+            path[::-1], critical_time
+        )
@@ -1,5 +1,6 @@
 import octako.bot as bot
 import octako.core as tako
+from octako import flow
 
 
 class NeuronTest(tako.Noop):
@@ -78,3 +79,53 @@ class TestCall(object):
             'Neuron1 should be 5 - 5 = 0'
             )
 
+
+
+class Recorder(bot.Bot):
+
+    def __init__(self):
+        super().__init__()
+        self.order = []
+
+    def _visit(self, neuron):
+        self.order.append(neuron)
+
+
+class TestTraverse(object):
+
+    def test_traverse_long_strand(self):
+        strand = tako.Strand([NeuronTest() for _ in range(5000)])
+        strand.bot_forward(bot.call.reset())
+        assert strand[4999].i == 0
+
+    def test_traverse_visits_flows_in_order(self):
+        n0 = NeuronTest()
+        n1 = NeuronTest()
+        n2 = NeuronTest()
+        n3 = NeuronTest()
+        multi = flow.Multi([n1, n2])
+        strand = n0 >> multi >> n3
+        recorder = Recorder()
+        strand.bot_forward(recorder)
+        visited = [
+            n for n in recorder.order if isinstance(n, NeuronTest)
+        ]
+        assert visited == [n0, n1, n2, n3]
+        assert recorder.order.index(multi) < recorder.order.index(n1)
+
+    def test_traverse_flow_with_bot_down(self):
+
+        class Wrap(flow.Flow):
+            def __init__(self, neuron):
+                super().__init__()
+                self.neuron = neuron
+
+            def bot_down(self, bot):
+                self.neuron.bot_forward(bot)
+
+        n0 = NeuronTest()
+        n1 = NeuronTest()
+        strand = Wrap(n0) >> n1
+        strand.bot_forward(bot.call.reset())
+        assert n0.i == 0
+        assert n1.i == 0
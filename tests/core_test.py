@@ -1,5 +1,11 @@
+import gc
+import pickle
+
+import numpy as np
 import pytest
 import octako.core as tako
+from octako import flow
+from octako import ref
 
 
 # @pytest.mark.incremental
@@ -287,3 +293,446 @@ class TestTako(object):
         assert s.s(1) == 2, (
             'The output of s should be 2'
         )
+
+    def test_override_arm_in_sub_class(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+
+        class _S(_T):
+            s = tako.in_ >> (lambda x: x + 2)
+
+        assert _S().s(1) == 3
+        assert _T().s(1) == 2
+
+    def test_arms_are_spawned_when_retrieved(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            t = tako.in_ >> (lambda x: x + 2)
+
+        t = _T()
+        controller = t.__armc__._parent
+        assert controller._arms == {}
+        t.s(1)
+        assert list(controller._arms.keys()) == ['s']
+
+    def test_arm_is_spawned_once_per_instance(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+
+        t1 = _T()
+        t2 = _T()
+        assert t1.s is t1.s
+        assert t1.s is not t2.s
+
+    def test_arm_referring_to_arm(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            t = tako.in_ >> ref.r(ref.my.s) >> (lambda x: x * 2)
+
+        assert _T().t(1) == 4
+
+    def test_arm_referring_to_arm_with_two_instances(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            t = tako.in_ >> ref.r(ref.my.s) >> (lambda x: x * 2)
+
+        t1 = _T()
+        t2 = _T()
+        assert t1.t(1) == 4
+        assert t2.t(2) == 6
+
+    def test_arm_is_descriptor(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+
+        assert isinstance(_T.__dict__['s'], tako._ArmAttr)
+        assert type(_T.s) == tako.Strand
+
+    def test_non_arm_attributes(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            y = 2
+
+            def f(self):
+                return self.y + 1
+
+        t = _T()
+        t.z = 3
+        assert t.f() == 3
+        assert t.z == 3
+        with pytest.raises(AttributeError):
+            t.w
+
+    def test_set_arm(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+
+        t = _T()
+        t.s = tako.in_ >> (lambda x: x + 2)
+        assert t.s(1) == 3
+        assert _T().s(1) == 2
+
+    def test_set_arm_to_value_that_is_not_an_arm(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+
+        t = _T()
+        t.s = 5
+        assert t.s == 5
+        assert _T().s(1) == 2
+        t.s = tako.in_ >> (lambda x: x + 2)
+        assert t.s(1) == 3
+
+
+class TestStrand(object):
+
+    def test_compile_creates_plan(self):
+        strand = tako.in_ >> (lambda x: x + 1) >> (lambda x: x * 2)
+        strand.compile()
+        assert len(strand.neurons) == 3
+        assert strand(1) == 4
+
+    def test_long_strand_does_not_recurse(self):
+        strand = tako.Strand([tako.Noop() for _ in range(5000)])
+        assert strand(1) == 1
+
+    def test_plan_invalidated_on_append(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        assert strand(1) == 2
+        strand.append(lambda x: x * 3)
+        assert strand(1) == 6
+
+    def test_plan_invalidated_on_prepend(self):
+        strand = tako.Strand([lambda x: x + 1])
+        assert strand(1) == 2
+        strand.prepend(lambda x: x * 3)
+        assert strand(1) == 4
+
+    def test_plan_invalidated_on_replace(self):
+        strand = tako.in_ >> tako.Noop() >> tako.out_
+        assert strand(1) == 1
+        strand[1].replace(tako.OpNeuron(lambda x: x + 2))
+        assert strand(1) == 3
+
+    def test_declaration_continues_to_rest_of_strand(self):
+        def op(x):
+            return x + 1
+
+        strand = tako.in_ >> tako.decl(tako.OpNeuron, op) >> (lambda x: x * 2)
+        assert strand(1) == 4
+        assert strand(1) == 4
+
+    def test_declaration_at_ends_of_strand_is_replaced(self):
+        strand = tako.Strand([
+            tako.decl(tako.OpNeuron, lambda x: x + 1), lambda x: x * 2
+        ])
+        assert strand(1) == 4
+        assert strand(1) == 4
+        assert type(strand.lhs) == tako.OpNeuron
+        strand = tako.Strand([
+            lambda x: x * 2, tako.decl(tako.OpNeuron, lambda x: x + 1)
+        ])
+        assert strand(1) == 3
+        assert type(strand.rhs) == tako.OpNeuron
+
+    def test_compiled_strand_can_be_pickled(self):
+        strand = tako.in_ >> flow.BotInform(tako.Noop()) >> tako.Noop()
+        assert strand(1, tako.SlotWarehouse()) == 1
+        strand = pickle.loads(pickle.dumps(strand))
+        assert strand(2, tako.SlotWarehouse()) == 2
+        strand[2].replace(tako.OpNeuron(abs))
+        assert strand(-2, tako.SlotWarehouse()) == 2
+
+    def test_unrelated_strand_does_not_invalidate_plan(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        strand.compile()
+        plan = strand._plan
+        other = tako.in_ >> (lambda x: x * 2)
+        other.append(lambda x: x + 3)
+        assert strand(1) == 2
+        assert strand._plan is plan
+
+
+class TestForwardBatch(object):
+
+    def test_forward_batch_with_per_item_fallback(self):
+        strand = tako.in_ >> (lambda x: x + 1) >> tako.out_
+        assert strand.forward_batch([1, 2, 3]) == [2, 3, 4]
+
+    def test_forward_batch_with_vectorized_op(self):
+        calls = []
+
+        def op(x):
+            calls.append(x)
+            return x * 2
+
+        strand = tako.in_ >> tako.OpNeuron(op, vectorized=True)
+        result = strand.forward_batch(np.arange(4))
+        assert (result == np.array([0, 2, 4, 6])).all()
+        assert len(calls) == 1
+
+    def test_forward_batch_with_sub_indexes_column(self):
+        strand = tako.in_ >> tako.Sub(1)
+        result = strand.forward_batch(np.array([[0, 1], [2, 3]]))
+        assert (result == np.array([1, 3])).all()
+
+    def test_forward_batch_with_arm(self):
+        arm = (tako.in_ >> (lambda x: x - 1)).arm()
+        strand = tako.in_ >> arm
+        assert strand.forward_batch([1, 2]) == [0, 1]
+
+    def test_forward_batch_with_declaration(self):
+        strand = tako.in_ >> tako.decl(tako.OpNeuron, lambda x: x + 1)
+        assert strand.forward_batch([1, 2]) == [2, 3]
+        assert type(strand[1]) == tako.OpNeuron
+
+
+class TestStrandMap(object):
+
+    def test_map_without_processes(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        assert list(strand.map(range(3))) == [1, 2, 3]
+
+    def test_map_with_processes(self):
+        strand = tako.in_ >> (lambda x: x * 2)
+        try:
+            result = list(strand.map(range(20), processes=2, chunksize=4))
+        finally:
+            strand.close()
+        assert result == [x * 2 for x in range(20)]
+
+    def test_map_unordered(self):
+        strand = tako.in_ >> (lambda x: x * 2)
+        try:
+            result = strand.map(range(20), processes=2, ordered=False)
+            result = sorted(result)
+        finally:
+            strand.close()
+        assert result == [x * 2 for x in range(20)]
+
+    def test_map_reuses_pool(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        try:
+            list(strand.map(range(2), processes=2))
+            pool = strand._pool
+            list(strand.map(range(2), processes=2))
+            assert strand._pool is pool
+            strand.append(lambda x: x * 10)
+            assert list(strand.map(range(2), processes=2)) == [10, 20]
+            assert strand._pool is not pool
+        finally:
+            strand.close()
+
+    def test_map_after_neuron_in_flow_is_replaced(self):
+        op = tako.OpNeuron(lambda x: x)
+        strand = tako.in_ >> flow.Multi([tako.in_ >> op])
+        try:
+            assert list(strand.map([1], processes=1)) == [[1]]
+            op.replace(tako.OpNeuron(lambda x: x * 100))
+            assert strand(1) == [100]
+            assert list(strand.map([1], processes=1)) == [[100]]
+        finally:
+            strand.close()
+
+    def test_map_keeps_pool_when_other_strand_is_built(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        try:
+            list(strand.map(range(2), processes=1))
+            pool = strand._pool
+            other = tako.in_ >> (lambda x: x * 2)
+            other.append(lambda x: x + 3)
+            assert list(strand.map(range(2), processes=1)) == [1, 2]
+            assert strand._pool is pool
+        finally:
+            strand.close()
+
+    def test_pool_is_closed_when_strand_is_collected(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        list(strand.map(range(2), processes=1))
+        finalizer = strand._pool_finalizer
+        del strand
+        gc.collect()
+        assert not finalizer.alive
+
+
+class _SlotUser(object):
+    pass
+
+
+class TestSlotWarehouse(object):
+
+    def test_inform_and_probe(self):
+        ware = tako.SlotWarehouse()
+        ware.inform('x', 1)
+        assert ware.probe('x') == (1, True)
+        assert ware.probe('not informed', 2) == (2, False)
+
+    def test_reset(self):
+        ware = tako.SlotWarehouse()
+        ware.inform('x', 1)
+        ware.reset()
+        assert ware.probe('x') == (None, False)
+
+    def test_uninform(self):
+        ware = tako.SlotWarehouse()
+        ware.inform('x', 1)
+        ware.uninform('x')
+        assert ware.probe('x') == (None, False)
+
+    def test_probe_with_bot_inform(self):
+        lam = flow.BotInform(lambda x: x + 1)
+        probe = flow.BotProbe(ref.ref(lam))
+        ware = tako.SlotWarehouse()
+        lam(2, ware)
+        assert probe(None, ware) == 3
+        assert ware.probe(lam.key) == (3, True)
+
+    def test_bot_inform_without_auto_reset(self):
+        lam = flow.BotInform(lambda x: x + 1, auto_reset=False)
+        ware = tako.SlotWarehouse()
+        assert lam(2, ware) == 3
+        assert lam(4, ware) == 3
+
+    def test_released_slot_is_reused(self):
+        users = [_SlotUser() for _ in range(10)]
+        for i, user in enumerate(users):
+            tako.Warehouse.lease_slot(user, ('reused', i))
+        n_slots = len(tako.Warehouse._slot_keys)
+        del users, user
+        gc.collect()
+        users = [_SlotUser() for _ in range(10)]
+        for i, user in enumerate(users):
+            tako.Warehouse.lease_slot(user, ('reused', i + 10))
+        assert len(tako.Warehouse._slot_keys) == n_slots
+
+    def test_reused_slot_does_not_return_old_value(self):
+        user = _SlotUser()
+        slot, _ = tako.Warehouse.lease_slot(user, 'old')
+        ware = tako.SlotWarehouse()
+        ware.inform_slot(slot, 1)
+        del user
+        gc.collect()
+        user = _SlotUser()
+        new_slot, _ = tako.Warehouse.lease_slot(user, 'new')
+        assert new_slot == slot
+        assert ware.probe_slot(new_slot) == (None, False)
+
+    def test_slot_shared_by_key_is_kept(self):
+        user1, user2 = _SlotUser(), _SlotUser()
+        slot, _ = tako.Warehouse.lease_slot(user1, 'shared')
+        assert tako.Warehouse.lease_slot(user2, 'shared')[0] == slot
+        del user1
+        gc.collect()
+        assert tako.Warehouse._slots['shared'] == slot
+
+    def test_inform_without_slot_does_not_assign_slot(self):
+        ware = tako.SlotWarehouse()
+        ware.inform('no slot', 1)
+        assert 'no slot' not in tako.Warehouse._slots
+        assert ware.probe('no slot') == (1, True)
+
+
+class TestLRUStore(object):
+
+    def test_get_moves_to_end(self):
+        store = tako.LRUStore(max_entries=2)
+        store.put('x', 1)
+        store.put('y', 2)
+        assert store.get('x') == (1, True)
+        store.put('z', 3)
+        assert store.get('y') == (None, False)
+        assert store.evictions == 1
+
+    def test_ttl_override(self):
+        store = tako.LRUStore(ttl=10.0)
+        now = [0.0]
+        store._clock = lambda: now[0]
+        store.put('x', 1, ttl=1.0)
+        store.put('y', 2)
+        now[0] = 5.0
+        assert store.get('x') == (None, False)
+        assert store.get('y') == (2, True)
+
+    def test_pop_and_clear(self):
+        store = tako.LRUStore(max_bytes=100)
+        store.put('x', np.zeros(2))
+        store.put('y', np.zeros(2))
+        assert store.pop('x').shape == (2,)
+        assert store.nbytes == 16
+        store.clear()
+        assert len(store) == 0
+        assert store.nbytes == 0
+
+
+class TestBoundedWarehouse(object):
+
+    def test_inform_and_probe(self):
+        ware = tako.BoundedWarehouse()
+        ware.inform('x', 1)
+        assert ware.probe('x') == (1, True)
+        assert ware.probe('y', 2) == (2, False)
+
+    def test_evicts_least_recently_used(self):
+        ware = tako.BoundedWarehouse(max_entries=2)
+        ware.inform('x', 1)
+        ware.inform('y', 2)
+        ware.probe('x')
+        ware.inform('z', 3)
+        assert ware.probe('y') == (None, False)
+        assert ware.probe('x') == (1, True)
+        assert ware.evictions == 1
+
+    def test_evicts_by_bytes(self):
+        ware = tako.BoundedWarehouse(max_bytes=100)
+        ware.inform('x', np.zeros(10))
+        ware.inform('y', np.zeros(10))
+        assert ware.probe('x')[1] is False
+        assert ware.nbytes == 80
+
+    def test_expires_after_ttl(self):
+        ware = tako.BoundedWarehouse(ttl=10.0)
+        now = [0.0]
+        ware._informed._clock = lambda: now[0]
+        ware.inform('x', 1)
+        ware.inform('y', 2, ttl=20.0)
+        now[0] = 15.0
+        assert ware.probe('x') == (None, False)
+        assert ware.probe('y') == (2, True)
+        assert ware.expirations == 1
+
+    def test_expires_after_generations(self):
+        ware = tako.BoundedWarehouse(max_generations=2)
+        ware.inform('x', 1)
+        ware.advance()
+        assert ware.probe('x') == (1, True)
+        ware.advance()
+        assert ware.probe('x') == (None, False)
+
+    def test_expired_values_are_removed_without_probing(self):
+        ware = tako.BoundedWarehouse(ttl=0.0)
+        for i in range(1000):
+            ware.inform(i, i)
+        assert len(ware._informed) == 0
+        assert ware.expirations == 1000
+
+    def test_old_generations_are_removed_without_probing(self):
+        ware = tako.BoundedWarehouse(max_generations=1)
+        for i in range(10):
+            ware.inform(i, i)
+            ware.advance()
+        assert len(ware._informed) == 0
+        assert ware.expirations == 10
+
+    def test_bot_inform_without_auto_reset(self):
+        lam = flow.BotInform(lambda x: x + 1, auto_reset=False)
+        ware = tako.BoundedWarehouse(max_generations=1)
+        assert lam(2, ware) == 3
+        assert lam(4, ware) == 3
+        ware.advance()
+        assert lam(4, ware) == 5
+
+    def test_spawn(self):
+        ware = tako.BoundedWarehouse(max_entries=1).spawn()
+        ware.inform('x', 1)
+        ware.inform('y', 1)
+        assert ware.evictions == 1
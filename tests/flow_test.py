@@ -1,7 +1,14 @@
+import asyncio
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import octako.core as tako
 from octako import flow
 import pytest
 from octako import bot
+from octako import iterator
 from octako import ref
 
 
@@ -49,6 +56,60 @@ class TestDelay(object):
         assert delay(3) == 1
 
 
+    def test_delay_3_repeats(self):
+        delay = flow.Delay(3, default=0)
+        assert [delay(i) for i in range(1, 8)] == [0, 0, 0, 1, 2, 3, 4]
+
+    def test_delay_reset(self):
+        delay = flow.Delay(2, default=0)
+        delay(1)
+        delay(2)
+        delay.reset()
+        assert delay(3) == 0
+
+    def test_delay_set_count(self):
+        delay = flow.Delay(2, default=0)
+        delay.count = 4
+        assert [delay(i) for i in range(1, 7)] == [0, 0, 0, 0, 1, 2]
+
+    def test_delay_in_strand(self):
+        strand = tako.in_ >> flow.Delay(1, default=0)
+        assert strand(1) == 0
+        assert strand(2) == 1
+
+
+class TestArrayDelay(object):
+
+    def test_array_delay(self):
+        delay = flow.ArrayDelay(2, shape=(2,))
+        assert (delay(np.array([1., 1.])) == 0).all()
+        assert (delay(np.array([2., 2.])) == 0).all()
+        assert (delay(np.array([3., 3.])) == 1).all()
+
+    def test_array_delay_batch(self):
+        delay = flow.ArrayDelay(2, default=-1)
+        assert (delay.call_batch(np.arange(5)) == [-1, -1, 0, 1, 2]).all()
+        assert (delay.call_batch(np.arange(5, 6)) == [3]).all()
+        assert delay(6) == 4
+
+    def test_array_delay_batch_after_call(self):
+        delay = flow.ArrayDelay(3)
+        delay(1)
+        delay(2)
+        assert (delay.call_batch(np.array([3, 4])) == [0, 1]).all()
+        assert delay(5) == 2
+
+    def test_array_delay_set_count(self):
+        delay = flow.ArrayDelay(1, shape=(2,))
+        delay.count = 3
+        assert delay.vals.shape == (3, 2)
+        assert (delay.call_batch(np.ones((4, 2)))[:, 0] == [0, 0, 0, 1]).all()
+
+    def test_array_delay_spawn(self):
+        delay = flow.ArrayDelay(1, shape=(2,), default=5).spawn()
+        assert (delay(np.zeros(2)) == 5).all()
+
+
 class TestDiverge(object):
     def test_flow_initialization(self):
         diverge = flow.Diverge(
@@ -170,6 +231,47 @@ class TestGate(object):
         )
 
 
+    def test_gate_batch(self):
+        calls = []
+
+        def sqrt(x):
+            calls.append(x)
+            return np.sqrt(x)
+
+        gate = flow.Gate(
+            cond=tako.OpNeuron(lambda x: x > 0, vectorized=True),
+            neuron=tako.OpNeuron(sqrt, vectorized=True),
+            batch=True, fill=-1.0
+        )
+        x = np.array([4., -1., 9., -2.])
+        mask, result = gate((x, x))
+        assert (mask == [True, False, True, False]).all()
+        assert (result == [2., -1., 3., -1.]).all()
+        assert len(calls) == 1
+        assert (calls[0] == [4., 9.]).all()
+
+    def test_gate_batch_with_no_rows_passing(self):
+        gate = flow.Gate(
+            cond=tako.OpNeuron(lambda x: x > 10, vectorized=True),
+            neuron=lambda x: x / 0,
+            batch=True, fill=0
+        )
+        x = np.array([1, 2])
+        mask, result = gate((x, x))
+        assert not mask.any()
+        assert (result == [0, 0]).all()
+
+    def test_gate_batch_with_lists(self):
+        gate = flow.Gate(
+            cond=lambda x: x == 1,
+            neuron=lambda x: x + 2,
+            batch=True
+        ).spawn()
+        mask, result = gate(([1, 0], [1, 1]))
+        assert list(mask) == [True, False]
+        assert result == [3, None]
+
+
 class TestMulti(object):
     
     def test_multi_initialization(self):
@@ -309,6 +411,53 @@ class TestSwitch(object):
             (0, 3)
         )
 
+    def test_switch_batch(self):
+        switch = flow.Switch(
+            lambda x: x,
+            {
+                0: lambda x: x + 1,
+                1: lambda x: x + 2,
+            },
+            default=lambda x: 0,
+            batch=True
+        )
+        paths, result = switch(([1, 0, 3, 1], [1, 2, 3, 4]))
+        assert paths == [1, 0, 3, 1]
+        assert result == [3, 3, 0, 6]
+
+    def test_switch_batch_runs_each_path_once(self):
+        calls = []
+
+        def add(x):
+            calls.append(x)
+            return x + 1
+
+        switch = flow.Switch(
+            tako.OpNeuron(lambda x: x % 2, vectorized=True),
+            {
+                0: tako.OpNeuron(add, vectorized=True),
+                1: tako.OpNeuron(lambda x: x * 10, vectorized=True),
+            },
+            batch=True
+        )
+        keys = np.arange(6)
+        paths, result = switch((keys, keys.astype(float)))
+        assert (paths == [0, 1, 0, 1, 0, 1]).all()
+        assert (result == [1, 10, 3, 30, 5, 50]).all()
+        assert len(calls) == 1
+
+    def test_switch_batch_without_default(self):
+        switch = flow.Switch(
+            lambda x: x, {0: lambda x: x + 1}, batch=True
+        )
+        _, result = switch(([0, 2], np.array([1, 1])))
+        assert list(result) == [2, 1]
+
+    def test_switch_spawn_without_default(self):
+        switch = flow.Switch(lambda x: x, {0: lambda x: x + 1}).spawn()
+        assert switch((1, 2)) == (1, 2)
+
+
 class TestCases(object):
     
     def test_switch_initialization(self):
@@ -370,6 +519,71 @@ class TestCases(object):
             ((0, 3))
         )
 
+    def test_cases_hits(self):
+        cases = flow.Cases(
+            [
+                flow.Gate(cond=lambda x: x == 0, neuron=lambda x: x - 1),
+            ],
+            default=lambda x: 0
+        )
+        cases((0, 4))
+        cases((0, 4))
+        cases((1, 4))
+        assert cases.hits[0] == 2
+        assert cases.hits[flow.Cases.DEFAULT_PATH] == 1
+
+    def test_cases_batch(self):
+        calls = []
+
+        def body(x):
+            calls.append(x)
+            return x * 10
+
+        cases = flow.Cases(
+            [
+                flow.Gate(
+                    cond=tako.OpNeuron(lambda x: x < 2, vectorized=True),
+                    neuron=tako.OpNeuron(body, vectorized=True)
+                ),
+                flow.Gate(
+                    cond=tako.OpNeuron(lambda x: x < 4, vectorized=True),
+                    neuron=tako.OpNeuron(lambda x: -x, vectorized=True)
+                ),
+            ],
+            default=lambda x: 0,
+            batch=True
+        )
+        x = np.arange(6)
+        paths, result = cases((x, x))
+        assert list(paths) == [0, 0, 1, 1, -1, -1]
+        assert list(result) == [0, 10, -2, -3, 0, 0]
+        assert len(calls) == 1
+        assert cases.hits == {0: 2, 1: 2, flow.Cases.DEFAULT_PATH: 2}
+
+    def test_cases_batch_without_default(self):
+        cases = flow.Cases(
+            [
+                flow.Gate(cond=lambda x: x == 1, neuron=lambda x: x + 1),
+            ],
+            batch=True
+        ).spawn()
+        paths, result = cases(([1, 0], [5, 6]))
+        assert list(paths) == [0, flow.Cases.NO_PATH]
+        assert result == [6, flow.Cases.NO_OUTPUT]
+
+    def test_cases_batch_with_strand_case(self):
+        cases = flow.Cases(
+            [
+                tako.in_ >> (lambda x: (x[0] == 1, x[1] + 1)),
+            ],
+            default=lambda x: x[1],
+            batch=True
+        )
+        paths, result = cases(([1, 0], [5, 6]))
+        assert list(paths) == [0, flow.Cases.DEFAULT_PATH]
+        assert result == [6, 6]
+
+
 class TestOnto(object):
     
     def test_onto_initialization(self):
@@ -516,6 +730,120 @@ class TestStore(object):
             'for the output'
         )
 
+class TestStoreRecord(object):
+
+    def test_store_records_outputs(self):
+        store = flow.Store(lambda x: x + 1, record='grow', capacity=2)
+        for i in range(5):
+            store(i)
+        assert list(store.history) == [1, 2, 3, 4, 5]
+
+    def test_store_records_array_outputs(self):
+        store = flow.Store(lambda x: x * np.ones(2), record='grow')
+        store(1)
+        store(2)
+        assert store.history.shape == (2, 2)
+        assert store.history[1, 0] == 2
+
+    def test_store_ring_keeps_last_outputs(self):
+        store = flow.Store(lambda x: x, record='ring', capacity=3)
+        for i in range(5):
+            store(i)
+        history = store.history
+        assert list(history) == [2, 3, 4]
+        assert history.base is store._buffer
+
+    def test_store_reset_keeps_buffer(self):
+        store = flow.Store(lambda x: x, record='ring', capacity=3)
+        store(1)
+        buffer = store._buffer
+        strand = tako.in_ >> store
+        strand.bot_forward(bot.call.reset())
+        assert len(store.history) == 0
+        store(2)
+        assert store._buffer is buffer
+        assert list(store.history) == [2]
+
+    def test_store_spawn_records(self):
+        store = flow.Store(lambda x: x, record='grow').spawn()
+        store(1)
+        assert list(store.history) == [1]
+
+
+class TestCache(object):
+
+    def _counted(self):
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            return x * 2
+        return calls, f
+
+    def test_cache_memoizes_output(self):
+        calls, f = self._counted()
+        cache = flow.Cache(f)
+        assert cache(2) == 4
+        assert cache(2) == 4
+        assert calls == [2]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_cache_evicts_least_recently_used(self):
+        calls, f = self._counted()
+        cache = flow.Cache(f, maxsize=2)
+        cache(1)
+        cache(2)
+        cache(1)
+        cache(3)
+        cache(1)
+        cache(2)
+        assert calls == [1, 2, 3, 2]
+        assert cache.evictions == 2
+        assert len(cache) == 2
+
+    def test_cache_expires_after_ttl(self):
+        calls, f = self._counted()
+        cache = flow.Cache(f, ttl=10.0)
+        now = [0.0]
+        cache._entries._clock = lambda: now[0]
+        cache(1)
+        now[0] = 5.0
+        cache(1)
+        now[0] = 11.0
+        cache(1)
+        assert calls == [1, 1]
+        assert cache.expirations == 1
+
+    def test_cache_with_numpy_input(self):
+        calls, f = self._counted()
+        cache = flow.Cache(f)
+        cache(np.arange(3))
+        assert list(cache(np.arange(3))) == [0, 2, 4]
+        cache(np.arange(3).astype(float))
+        assert len(calls) == 2
+
+    def test_cache_bypasses_unhashable_input(self):
+        calls, f = self._counted()
+        cache = flow.Cache(lambda x: x['a'])
+        assert cache({'a': 1}) == 1
+        assert len(cache) == 0
+
+    def test_cache_reset_with_bot(self):
+        calls, f = self._counted()
+        strand = tako.in_ >> flow.Cache(f)
+        strand(1)
+        strand.bot_forward(bot.call.reset())
+        strand(1)
+        assert calls == [1, 1]
+
+    def test_cache_spawn(self):
+        calls, f = self._counted()
+        cache = flow.Cache(f, maxsize=1).spawn()
+        cache(1)
+        cache(2)
+        assert cache.evictions == 1
+
+
 class TestBotInform(object):
     
     def test_botinform_init(self):
@@ -563,6 +891,57 @@ class TestBotInform(object):
         )
 
 class TestBotProbe(object):
+
+    def test_probe_after_inform_is_replaced(self):
+        class H(object):
+            pass
+
+        h = H()
+        h.inf = flow.BotInform(lambda x: x + 1)
+        probe = flow.BotProbe(ref.ref(h).inf)
+        ware = tako.SlotWarehouse()
+        h.inf(1, ware)
+        assert probe(None, ware) == 2
+        h.inf = flow.BotInform(lambda x: x + 10)
+        tako.invalidate_bindings()
+        h.inf(2, ware)
+        assert probe(None, ware) == 12
+
+    def test_probe_in_tako_after_inform_is_replaced(self):
+        class _T(tako.Tako):
+            probe = tako.Strand([flow.BotProbe(ref.my.inf)])
+
+        t = _T()
+        t.inf = flow.BotInform(lambda x: x + 1)
+        ware = tako.SlotWarehouse()
+        t.inf(1, ware)
+        assert t.probe(None, ware) == 2
+        t.inf = flow.BotInform(lambda x: x + 10)
+        t.inf(2, ware)
+        assert t.probe(None, ware) == 12
+
+    def test_probe_does_not_evaluate_ref_each_probe(self):
+        lam = flow.BotInform(lambda x: x + 1)
+        evaluated = []
+
+        class H(object):
+            @property
+            def inf(self):
+                evaluated.append(True)
+                return lam
+
+        probe = flow.BotProbe(ref.ref(H()).inf)
+        ware = tako.SlotWarehouse()
+        lam(1, ware)
+        for _ in range(5):
+            assert probe(None, ware) == 2
+        assert len(evaluated) == 1
+
+    def test_bot_inform_can_be_pickled(self):
+        lam = pickle.loads(pickle.dumps(flow.BotInform(tako.Noop())))
+        ware = tako.SlotWarehouse()
+        lam(2, ware)
+        assert ware.probe(lam.key) == (2, True)
     
     def test_botinform_init(self):
         lam = flow.BotInform(lambda x: x + 1)
@@ -607,3 +986,196 @@ class TestBotProbe(object):
             'Warehouse have stored the value 3 ' + 
             'for the output'
         )
+
+
+class TestExecutor(object):
+
+    def test_multi_with_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            multi = flow.Multi(
+                [lambda x: x + 1, lambda x: x + 2], executor=executor
+            )
+            assert multi(1) == [2, 3]
+
+    def test_multi_with_executor_runs_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(x):
+            barrier.wait()
+            return x
+
+        with ThreadPoolExecutor(2) as executor:
+            multi = flow.Multi([wait, wait], executor=executor)
+            assert multi(1) == [1, 1]
+
+    def test_diverge_with_use_executor(self):
+        diverge = flow.Diverge([lambda x: x + 1, lambda x: x * 2])
+        with ThreadPoolExecutor(2) as executor:
+            with flow.use_executor(executor):
+                assert diverge([1, 3]) == [2, 6]
+        assert flow._executor.get() is None
+
+    def test_multi_with_executor_raises_error(self):
+        def fail(x):
+            raise ValueError('fail')
+
+        with ThreadPoolExecutor(2) as executor:
+            multi = flow.Multi(
+                [lambda x: x, fail], executor=executor
+            )
+            with pytest.raises(ValueError):
+                multi(1)
+
+    def test_nested_multi_with_one_worker(self):
+        strand = tako.in_ >> flow.Multi([
+            tako.in_ >> flow.Multi([lambda x: x + 1, lambda x: x + 2]),
+            lambda x: x + 3
+        ])
+        with ThreadPoolExecutor(1) as executor:
+            with flow.use_executor(executor):
+                assert strand(1) == [[2, 3], 4]
+
+    def test_use_executor_only_in_thread(self):
+        found = []
+        with ThreadPoolExecutor(1) as executor:
+            with flow.use_executor(executor):
+                thread = threading.Thread(
+                    target=lambda: found.append(flow._executor.get())
+                )
+                thread.start()
+                thread.join()
+        assert found == [None]
+
+    def test_multi_spawn_keeps_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            multi = flow.Multi(
+                [lambda x: x + 1], executor=executor
+            ).spawn()
+            assert multi._executor is executor
+            assert multi(1) == [2]
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+class TestAsync(object):
+
+    def test_acall_with_sync_neurons(self):
+        store = flow.Store(lambda x: x * 2)
+        strand = tako.in_ >> (lambda x: x + 1) >> store
+        assert _run(strand.acall(1)) == 4
+        assert store.output == 4
+
+    def test_acall_awaits_coroutine(self):
+        async def add(x):
+            return x + 1
+
+        strand = tako.in_ >> add >> (lambda x: x * 2)
+        assert _run(strand.acall(1)) == 4
+
+    def test_multi_acall_gathers_branches(self):
+        started = []
+
+        async def branch(x):
+            started.append(x)
+            await asyncio.sleep(0)
+            # both branches must have started before either finishes
+            assert len(started) == 2
+            return x
+
+        multi = flow.Multi([branch, branch])
+        assert _run(multi.acall(1)) == [1, 1]
+
+    def test_onto_acall(self):
+        async def one(x):
+            return 1
+
+        onto = flow.Onto(tako.nil_ >> one)
+        assert _run(onto.acall(2)) == [2, 1]
+
+    def test_switch_acall_awaits_chosen_path(self):
+        called = []
+
+        async def path(x):
+            called.append(x)
+            return x + 1
+
+        async def other(x):
+            called.append(None)
+            return x
+
+        switch = flow.Switch(lambda x: x, {0: path, 1: other})
+        assert _run(switch.acall((0, 2))) == (0, 3)
+        assert called == [2]
+
+    def test_gate_acall_with_fail(self):
+        async def cond(x):
+            return x == 1
+
+        gate = flow.Gate(cond=cond, neuron=lambda x: x + 2)
+        assert _run(gate.acall((0, 1))) == (False, None)
+        assert _run(gate.acall((1, 1))) == (True, 3)
+
+
+class Count(tako.Neuron):
+
+    def __init__(self, end):
+        super().__init__()
+        self.end = end
+        self.i = 0
+
+    def __call__(self, x, wh=None):
+        self.i += 1
+        return self.i < self.end, self.i
+
+    def spawn(self):
+        return Count(self.end)
+
+
+class TestRepeat(object):
+
+    def test_repeat_outputs_last(self):
+        repeat = flow.Repeat(Count(3))
+        assert repeat(None) == 3
+
+    def test_repeat_output_all(self):
+        repeat = flow.Repeat(Count(3), output_all=True)
+        assert repeat(None) == [1, 2, 3]
+
+    def test_repeat_keep_last(self):
+        repeat = flow.Repeat(Count(5), output_all=True, keep_last=2)
+        assert repeat(None) == [4, 5]
+
+    def test_repeat_stream_is_lazy(self):
+        count = Count(3)
+        repeat = flow.Repeat(count, stream=True)
+        steps = repeat(None)
+        assert count.i == 0
+        assert next(steps) == 1
+        assert count.i == 1
+        assert list(steps) == [2, 3]
+
+    def test_repeat_stream_to_strand(self):
+        strand = (
+            tako.in_ >> flow.Repeat(Count(3), stream=True) >>
+            (lambda steps: sum(steps))
+        )
+        assert strand(None) == 6
+
+    def test_repeat_with_iterate(self):
+        strand = (
+            tako.in_ >> iterator.Accessor() >> iterator.ToIter() >>
+            flow.Repeat(iterator.Iterate(), output_all=True)
+        )
+        assert strand([1, 2]) == [1, 2, None]
+
+    def test_repeat_acall_stream(self):
+        async def consume():
+            steps = await flow.Repeat(Count(3), stream=True).acall(None)
+            return [step async for step in steps]
+        assert _run(consume()) == [1, 2, 3]
+
+    def test_repeat_spawn_keeps_stream(self):
+        repeat = flow.Repeat(Count(2), stream=True).spawn()
+        assert list(repeat(None)) == [1, 2]
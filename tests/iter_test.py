@@ -54,6 +54,44 @@ class TestShuffle(object):
         acc.wrap(meta)
         assert len(acc) == 3
 
+    def _items(self, acc):
+        return [acc[i] for i in range(len(acc))]
+
+    def test_getitem_with_strings(self):
+        acc = iterator.Accessor(['a', 'b', 'c'])
+        acc.wrap(iterator.Shuffle())
+        assert sorted(self._items(acc)) == ['a', 'b', 'c']
+
+    def test_seed_is_reproducible(self):
+        data = list(range(20))
+        acc1 = iterator.Accessor(data)
+        acc1.wrap(iterator.Shuffle(seed=1))
+        acc2 = iterator.Accessor(data)
+        acc2.wrap(iterator.Shuffle(seed=1).spawn())
+        assert self._items(acc1) == self._items(acc2)
+
+    def test_new_epoch_reseeds(self):
+        meta = iterator.Shuffle(list(range(20)), seed=1)
+        first = [meta[i] for i in range(20)]
+        meta.new_epoch()
+        second = [meta[i] for i in range(20)]
+        assert first != second
+        assert sorted(second) == list(range(20))
+        assert second == [
+            iterator.Shuffle(list(range(20)), seed=2)[i] for i in range(20)
+        ]
+
+    def test_block_shuffle(self):
+        meta = iterator.Shuffle(list(range(10)), seed=0, block_size=4)
+        items = [meta[i] for i in range(10)]
+        assert sorted(items) == list(range(10))
+        # each block is accessed contiguously
+        starts = [i for i in range(10) if items[i] % 4 == 0]
+        for start in starts:
+            block = list(range(items[start], min(items[start] + 4, 10)))
+            assert items[start:start + len(block)] == block
+        assert len(starts) == 3
+
 class TestBatch(object):
     
     def test_initialization(self):
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+import octako.core as tako
+from octako import flow
+from octako import profiler
+from octako import ref
+from octako import schedule
+
+
+class TestProfiler(object):
+
+    def test_records_calls(self):
+        strand = tako.in_ >> (lambda x: x + 1) >> (lambda x: x * 2)
+        with profiler.Profiler(strand) as prof:
+            strand(1)
+            strand(2)
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:OpNeuron'].calls == 2
+        assert stats['2:OpNeuron'].calls == 2
+
+    def test_attach_to_compiled_strand(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        strand(1)
+        with profiler.Profiler(strand) as prof:
+            strand(1)
+        strand(1)
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:OpNeuron'].calls == 1
+
+    def test_detach_restores_neurons(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        prof = profiler.Profiler(strand)
+        prof.detach()
+        strand(1)
+        assert all(s.calls == 0 for s in prof.stats())
+        assert type(strand[1]) is tako.OpNeuron
+
+    def test_records_nesting(self):
+        strand = tako.in_ >> flow.Multi([lambda x: x + 1])
+        with profiler.Profiler(strand) as prof:
+            strand(1)
+        stats = {s.label: s for s in prof.stats()}
+        multi = stats['1:Multi']
+        inner = stats['3:OpNeuron']
+        assert inner.parent == '1:Multi'
+        assert multi.total >= inner.total
+        assert multi.self_time <= multi.total
+
+    def test_records_exceptions(self):
+        def fail(x):
+            raise ValueError
+
+        strand = tako.in_ >> fail
+        with profiler.Profiler(strand) as prof:
+            with pytest.raises(ValueError):
+                strand(1)
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:OpNeuron'].exceptions == 1
+
+    def test_attach_to_tako(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            t = tako.in_ >> ref.r(ref.my.s) >> (lambda x: x * 2)
+
+        t = _T()
+        with profiler.Profiler(t) as prof:
+            assert t.t(1) == 4
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['t/1:NeuronRef'].calls == 1
+        assert stats['t/5:OpNeuron'].calls == 1
+
+    def test_records_arm_called_through_ref(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> (lambda x: x + 1)
+            t = tako.in_ >> ref.r(ref.my.s) >> (lambda x: x * 2)
+
+        t = _T()
+        with profiler.Profiler(t) as prof:
+            t.t(1)
+            t.t(2)
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['t/2:Arm'].calls == 2
+        assert stats['t/2:Arm'].parent == 't/1:NeuronRef'
+
+    def test_records_batch_as_one_call(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        with profiler.Profiler(strand) as prof:
+            assert strand.forward_batch([1, 2, 3]) == [2, 3, 4]
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:OpNeuron'].calls == 1
+
+    def test_records_acall(self):
+        strand = tako.in_ >> flow.Multi([lambda x: x + 1, lambda x: x * 2])
+        with profiler.Profiler(strand) as prof:
+            assert asyncio.run(strand.acall(2)) == [3, 4]
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:Multi'].calls == 1
+        assert stats['3:OpNeuron'].calls == 1
+        assert stats['3:OpNeuron'].parent == '1:Multi'
+
+    def test_records_schedule(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        with profiler.Profiler(strand) as prof:
+            run = schedule.Schedule(strand, max_workers=1)
+            try:
+                assert run(1) == 2
+            finally:
+                run.close()
+        stats = {s.label: s for s in prof.stats()}
+        assert stats['1:OpNeuron'].calls == 1
+
+    def test_report(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        with profiler.Profiler(strand) as prof:
+            strand(1)
+        report = prof.report(sort_by='calls')
+        lines = report.split('\n')
+        assert lines[0].split() == list(profiler.Profiler.COLUMNS)
+        assert len(lines) == 3
@@ -1,4 +1,7 @@
+import numpy as np
+
 from octako import ref
+from octako import flow
 from octako import to_neuron
 import octako.core as tako
 
@@ -200,3 +203,283 @@ class TestCall(object):
         
         strand = tako.in_ >> r
         assert strand.spawn()(J) == 'a_a'
+
+
+class TestNeuronRefMemoize(object):
+
+    def _tako(self, calls, neuron=None):
+        def count(x):
+            calls.append(x)
+            return x + 1
+
+        class _T(tako.Tako):
+            s = tako.in_ >> (neuron or count)
+            t = tako.in_ >> flow.Multi([
+                ref.r(ref.my.s), ref.r(ref.my.s)
+            ])
+        return _T()
+
+    def test_arm_is_called_once_with_memoize(self):
+        calls = []
+        t = self._tako(calls)
+        assert t.t(1, tako.Warehouse(memoize=True)) == [2, 2]
+        assert calls == [1]
+
+    def test_arm_is_called_for_each_ref_without_memoize(self):
+        calls = []
+        t = self._tako(calls)
+        assert t.t(1, tako.Warehouse()) == [2, 2]
+        assert calls == [1, 1]
+
+    def test_stateful_arm_is_not_memoized(self):
+        calls = []
+        t = self._tako(calls, flow.Store(lambda x: calls.append(x) or x))
+        t.t(1, tako.Warehouse(memoize=True))
+        assert calls == [1, 1]
+
+    def test_memo_does_not_carry_across_passes(self):
+        class _U(tako.Tako):
+            g = tako.in_ >> flow.Onto(ref.my.k) >> (lambda x: x[0] + x[1])
+            f = tako.in_ >> flow.Multi([ref.r(ref.my.g), ref.r(ref.my.g)])
+
+            def __init__(self):
+                self.k = 5
+
+        u = _U()
+        wh = tako.Warehouse(memoize=True)
+        x = 1
+        assert u.f(x, wh) == [6, 6]
+        u.k = 100
+        assert u.f(x, wh) == [101, 101]
+        assert wh._memo == {}
+
+    def test_reset_forgets_outputs(self):
+        calls = []
+        t = self._tako(calls)
+        wh = tako.Warehouse(memoize=True)
+        x = 1
+        t.t(x, wh)
+        wh.reset()
+        t.t(x, wh)
+        assert calls == [1, 1]
+
+
+class TestIsPure(object):
+
+    def test_pure_strand(self):
+        assert tako.is_pure((tako.in_ >> (lambda x: x)).lhs)
+
+    def test_strand_with_delay(self):
+        assert not tako.is_pure((tako.in_ >> flow.Delay()).lhs)
+
+    def test_ref_calling_method(self):
+        assert not tako.is_pure(tako.to_neuron(ref.my.f()))
+
+
+class TestCompilePath(object):
+
+    def _path(self, placeholder):
+        return placeholder.__refindex__
+
+    def test_attrs_and_indices(self):
+        class V:
+            a = {'b': [0, 1, 2]}
+        
+        get = ref.compile_path(self._path(ref.emission.a['b'][2]))
+        assert get(V, None) == 2
+
+    def test_chained_attrs(self):
+        class W:
+            c = 3
+
+        class V:
+            b = W
+
+        get = ref.compile_path(self._path(ref.emission.b.c))
+        assert get(V, None) == 3
+
+    def test_call_after_attrs(self):
+        class W:
+            def f(self, x):
+                return x + 1
+
+        class V:
+            w = W()
+
+        get = ref.compile_path(self._path(ref.emission.w.f(ref.emission)))
+        assert get(V, 1) == 2
+
+    def test_empty_path(self):
+        assert ref.compile_path([])(1, None) == 1
+
+
+class TestInCallArgs(object):
+
+    def test_call_with_kwargs(self):
+        def y(a, b):
+            return a - b
+
+        r = ref.Call(y, b=ref.emission, a=3)
+        assert r(1) == 2
+
+    def test_call_with_constant_args(self):
+        def y(a, b):
+            return a + b
+
+        r = ref.Call(y, 1, 2)
+        assert r(None) == 3
+
+
+class TestMethodCache(object):
+
+    def _tako(self):
+        class _T(tako.Tako):
+            s = tako.in_ >> ref.my.f(ref.emission)
+
+            def f(self, x):
+                return x + 1
+        return _T
+
+    def test_method_is_called(self):
+        t = self._tako()()
+        assert t.s(1) == 2
+        assert t.s(2) == 3
+
+    def test_assigning_method_invalidates(self):
+        t = self._tako()()
+        assert t.s(1) == 2
+        t.f = lambda x: x + 10
+        assert t.s(1) == 11
+
+    def test_assigning_method_to_class_invalidates(self):
+        T = self._tako()
+        t = T()
+        assert t.s(1) == 2
+        T.f = lambda self, x: x + 20
+        assert t.s(1) == 21
+
+    def test_unwatched_attribute_does_not_bump_version(self):
+        t = self._tako()()
+        t.s(1)
+        version = t.__armc__.version
+        t.counter = 1
+        assert t.__armc__.version == version
+        t.f = lambda x: x
+        assert t.__armc__.version == version + 1
+
+    def test_custom_setattr_is_kept(self):
+        assigned = []
+
+        class _T(self._tako()):
+            def __setattr__(self, k, v):
+                assigned.append(k)
+                super().__setattr__(k, v)
+
+        t = _T()
+        assert t.s(1) == 2
+        t.f = lambda x: x + 10
+        assert assigned[-1] == 'f'
+        assert t.s(1) == 11
+
+    def test_invalidate_bindings(self):
+        t = self._tako()()
+        assert t.s(1) == 2
+        t.__dict__['f'] = lambda x: x + 30
+        tako.invalidate_bindings()
+        assert t.s(1) == 31
+
+
+class TestNeuronRefCache(object):
+
+    def _tako(self):
+        class _T(tako.Tako):
+            a = tako.in_ >> (lambda x: x + 1)
+            b = tako.in_ >> ref.r(ref.my.a) >> (lambda x: x * 2)
+        return _T()
+
+    def _neuron_ref(self, t):
+        return t.b.strand.neurons[1]
+
+    def test_resolved_arm_is_cached(self):
+        t = self._tako()
+        assert t.b(1) == 4
+        neuron_ref = self._neuron_ref(t)
+        assert neuron_ref._resolved[3] is t.__armc__.getarm('a')
+
+    def test_other_instance_does_not_invalidate(self):
+        t1 = self._tako()
+        t2 = type(t1)()
+        t1.b(1)
+        resolved = self._neuron_ref(t1)._resolved
+        t2.a = tako.in_ >> (lambda x: x + 2)
+        assert t1.b(1) == 4
+        assert self._neuron_ref(t1)._resolved is resolved
+
+    def test_unrelated_attribute_does_not_invalidate(self):
+        t = self._tako()
+        t.b(1)
+        resolved = self._neuron_ref(t)._resolved
+        t.counter = 1
+        t.b(1)
+        assert self._neuron_ref(t)._resolved is resolved
+
+    def test_setarm_invalidates(self):
+        t = self._tako()
+        assert t.b(1) == 4
+        t.a = tako.in_ >> (lambda x: x + 2)
+        assert t.b(1) == 6
+
+    def test_ref_with_call_is_not_cached(self):
+        neuron_ref = ref.r(ref.my.f())
+        assert neuron_ref._cacheable is False
+
+    def test_val_ref_is_not_cached(self):
+        class H(object):
+            n = tako.in_ >> (lambda x: x + 1)
+
+        h = H()
+        strand = tako.in_ >> ref.r(ref.ref(h).n)
+        assert strand(1) == 2
+        h.n = tako.in_ >> (lambda x: x + 100)
+        assert strand(1) == 101
+
+    def test_emission_ref_is_not_cached(self):
+        neuron_ref = ref.r(ref.emission.f)
+        assert neuron_ref._cacheable is False
+
+
+class TestEmissionRefBatch(object):
+
+    def test_column_of_2d_array(self):
+        xs = np.arange(6).reshape(3, 2)
+        column = tako.to_neuron(ref.emission[1]).call_batch(xs)
+        assert list(column) == [1, 3, 5]
+        assert np.shares_memory(column, xs)
+
+    def test_field_of_structured_array(self):
+        xs = np.array(
+            [(1.0, 2), (3.0, 4)], dtype=[('price', 'f8'), ('count', 'i4')]
+        )
+        column = tako.to_neuron(ref.emission['price']).call_batch(xs)
+        assert list(column) == [1.0, 3.0]
+        assert np.shares_memory(column, xs)
+
+    def test_dict_of_arrays(self):
+        xs = {'price': np.arange(6).reshape(3, 2)}
+        column = tako.to_neuron(ref.emission['price'][0]).call_batch(xs)
+        assert list(column) == [0, 2, 4]
+
+    def test_rows_without_columns(self):
+        xs = [{'price': 1}, {'price': 2}]
+        assert tako.to_neuron(ref.emission['price']).call_batch(xs) == [1, 2]
+
+    def test_attr_is_evaluated_on_each_row(self):
+        class T(object):
+            f = 2
+
+        assert tako.to_neuron(ref.emission.f).call_batch([T, T]) == [2, 2]
+
+    def test_in_strand(self):
+        strand = tako.in_ >> ref.emission[0]
+        xs = np.arange(4).reshape(2, 2)
+        assert list(strand.forward_batch(xs)) == [0, 2]
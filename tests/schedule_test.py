@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+import octako.core as tako
+from octako import flow
+from octako import schedule
+
+
+class TestSchedule(object):
+
+    def test_schedule_matches_strand(self):
+        strand = (
+            tako.in_ >> (lambda x: x + 1) >>
+            flow.Multi([lambda x: x * 2, tako.in_ >> (lambda x: x - 1)]) >>
+            flow.Diverge([lambda x: x + 1, lambda x: x + 2]) >>
+            flow.Onto(tako.in_ >> (lambda x: 5))
+        )
+        with_schedule = schedule.Schedule(strand, max_workers=2)
+        assert with_schedule(1) == strand(1)
+        with_schedule.close()
+
+    def test_schedule_with_under(self):
+        strand = tako.in_ >> flow.Under(lambda x: 2)
+        assert schedule.Schedule(strand)(1) == [2, 1]
+
+    def test_multi_strands_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(x):
+            barrier.wait()
+            return x
+
+        strand = tako.in_ >> flow.Multi([wait, wait])
+        assert schedule.Schedule(strand, max_workers=2)(1) == [1, 1]
+
+    def test_merged_strand_runs_with_upstream(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(x):
+            barrier.wait()
+            return 1
+
+        strand = tako.in_ >> wait >> flow.Onto(tako.in_ >> wait)
+        assert schedule.Schedule(strand, max_workers=2)(0) == [1, 1]
+
+    def test_stateful_neurons_run_in_order(self):
+        log = []
+
+        def slow(x):
+            time.sleep(0.05)
+            log.append('a')
+
+        strand = tako.in_ >> flow.Multi([
+            flow.Store(slow), flow.Store(lambda x: log.append('b'))
+        ])
+        schedule.Schedule(strand, max_workers=2)(1)
+        assert log == ['a', 'b']
+
+    def test_report_has_critical_path(self):
+        def slow(x):
+            time.sleep(0.05)
+            return x
+
+        strand = tako.in_ >> flow.Multi([slow, lambda x: x])
+        scheduled = schedule.Schedule(strand, max_workers=2)
+        scheduled(1)
+        assert scheduled.report.critical_path[-1].endswith('OpNeuron')
+        assert scheduled.report.critical_time >= 0.05
+        assert scheduled.report.wall_time >= scheduled.report.critical_time
+
+    def test_exception_is_raised(self):
+        def fail(x):
+            raise ValueError()
+
+        strand = tako.in_ >> flow.Multi([fail, lambda x: x])
+        with pytest.raises(ValueError):
+            schedule.Schedule(strand)(1)
+
+    def test_schedule_recompiles_when_network_changes(self):
+        strand = tako.in_ >> (lambda x: x + 1)
+        scheduled = schedule.Schedule(strand)
+        assert scheduled(1) == 2
+        strand.append(lambda x: x * 3)
+        assert scheduled(1) == 6